@@ -1,102 +1,81 @@
 #!/usr/bin/python3
 
 import sys
-import multiprocessing
-from queue import Empty
-from time import sleep
+import wordindex
+import resultdag
+import basefinder
+from basefinder import option
+from bisect import bisect_left
 
 
-class AnagramFinder():
+# The word list engine. The words that fit in what's left of the letters are found
+# in whichever way should be quickest: going through every combination of the
+# letters, looking the words up by the mask of letters they contain, or going
+# through the word list, with or without NumPy. The cache refers to words by their
+# place in the word list, so isn't kept from one phrase to the next.
 
-    def __init__(self, filename):
-        self.allowed_letters = 'abcdefghijklmnopqrstuvwxyz'
 
-        self.proc_count = 1
+class AnagramFinder(basefinder.BaseFinder):
 
-        self.caching_enabled = False
-        self.cache_limit = 1000000
-        self.cache_clear_fraction = 0.1
+    ENGINE_OPTIONS = [
+        option('nobuckets', 'mask_buckets_enabled', False, "--nobuckets", "Never looks words up by the letters they contain"),
+    ]
 
-        self.fast_path_enabled = True
-        self.fast_path_iter_rel_speed = 0.3
-
-        self.result_batch_size = 1000
-
-        # Load dictionary of words
-        self.words = []
-        f = open(filename)
-        for line in f:
-            word = line.strip()
-            self.words.append(word)
-        f.close()
-
-    def find(self, letters, display=None):
-        # Turn string into a map of each letter and the number of times it occurs
-        letter_map = self.word_to_letter_map(letters)
-
-        args = [[letter_map, display]] * self.proc_count
-        results = self.multiprocess_job(self.do_proc, args)
-        return self.sort_results(results)
-
-    def multiprocess_job(self, target, args):
-        # Start a process for each set of arguments
-        max_t = len(args)
-        procs = []
-        queue = multiprocessing.Queue()
-        for t in range(0, max_t):
-            proc = multiprocessing.Process(
-                target=target,
-                args=[t, max_t, queue] + args[t],
-                daemon=True)
-            proc.start()
-            procs.append(proc)
-
-        # Read results from processes while waiting for them to finish
-        results = []
-        for proc in procs:
-            while proc.is_alive():
-                sleep(0.001)
-                while True:
-                    try:
-                        r = queue.get(block=False)
-                        results.extend(r)
-                    except Empty:
-                        break
+    cache_keepable = False
 
-        # Add the last of the queue to the results, and return them
-        while not queue.empty():
-            results.extend(queue.get())
-        return results
+    def __init__(self, filename, index=None):
+        super().__init__(filename, index)
 
-    def do_proc(self, t, max_t, queue, letter_map, display):
-        self.init_wordlist(letter_map)
+        self.fast_path_enabled = True
+        self.fast_path_iter_rel_speed = 0.3
 
-        self.result_cache = {}
-        results = self.search_wordlist(letter_map, t, max_t, t, 0, display)
-        for i in range(0, len(results), self.result_batch_size):
-            next_i = i + self.result_batch_size
-            if next_i >= len(results):
-                queue.put(results[i:])
-            else:
-                queue.put(results[i:next_i])
-
-    def init_wordlist(self, letter_map):
-        # Create a list of all words organised by the letters they contain,
-        # so words that are anagrams of each other are grouped together
-        self.normalised_word_map = {}
-        for word in self.words:
-            word_letter_map = self.word_to_letter_map(word)
-            found, letters_left = self.word_in_letters(word_letter_map, letter_map)
-            if found:
-                key = self.letter_map_to_key(word_letter_map)
-                if key not in self.normalised_word_map:
-                    self.normalised_word_map[key] = (key, word_letter_map, [])
-                self.normalised_word_map[key][2].append(word)
-
-        # Sort the word list by word length, longest words first
-        self.letter_map_to_words = sorted(self.normalised_word_map.values(), key=lambda x: len(x[0]), reverse=True)
-        self.letter_map_to_words_count = len(self.letter_map_to_words)
-        self.letter_map_reverse = dict([(l[0], i) for i, l in enumerate(self.letter_map_to_words)])
+        # Look words up by the mask of letters they contain, trying each mask that can
+        # be made from the letters left, when there are few enough of those masks. It's
+        # quicker than going through every combination of letters, so is tried first
+        self.mask_buckets_enabled = True
+        self.mask_bucket_rel_speed = 0.2
+
+        self.numpy_min_words = 500
+
+    def init_search(self, letter_map):
+        self.letter_count = self.letter_map_count(letter_map)
+
+    def worker_settings(self):
+        settings = super().worker_settings()
+        settings.update({
+            'fast_path_enabled': self.fast_path_enabled,
+            'fast_path_iter_rel_speed': self.fast_path_iter_rel_speed,
+            'mask_buckets_enabled': self.mask_buckets_enabled,
+            'mask_bucket_rel_speed': self.mask_bucket_rel_speed,
+            'numpy_min_words': self.numpy_min_words,
+        })
+        return settings
+
+    def toplevel_start(self):
+        return self.length_start(self.letter_count, 0)
+
+    def subtree_start(self, wordi):
+        return wordi + 1
+
+    def search_part(self, wordi, sub_start=None, sub_stop=None):
+        edges = []
+        self.add_edges(edges, wordi, self.packed, self.letter_count, sub_start, sub_stop, self.words_left())
+        self.check_deadline()
+        return resultdag.ref(edges, wordi)
+
+    def search_all(self):
+        return self.search_wordlist(self.packed, self.letter_count, 0, words_left=self.words_left())
+
+    def init_wordlist_ids(self, ids):
+        # Along with the word list, the positions of the groups with each mask, in order
+        super().init_wordlist_ids(ids)
+        self.mask_buckets = {}
+        for i, lmw in enumerate(self.letter_map_to_words):
+            if lmw[4] not in self.mask_buckets:
+                self.mask_buckets[lmw[4]] = []
+            self.mask_buckets[lmw[4]].append(i)
+        self.word_matrix = None
+        self.packed_reverse = dict([(l[1], i) for i, l in enumerate(self.letter_map_to_words)])
 
         # Index of word list by length, so when we only have eg 5 letters,
         # we can jump to the part of the list with words of that length
@@ -106,87 +85,181 @@ class AnagramFinder():
             if l not in self.word_length_index:
                 self.word_length_index[l] = i
 
-    def search_wordlist(self, letter_map, t, max_t, start, level, display=None):
-        toplevel = level == 0
-        key = self.letter_map_to_key(letter_map)
-        cache_stop = None
-        if self.caching_enabled and key in self.result_cache:
-            self.result_cache[key][2] += 1
-            if self.result_cache[key][1] <= start:
-                return self.results_as_list(self.result_cache[key][0], start)
-            else:
-                cache_stop = self.result_cache[key][1]
-
-        # Get total number of letters we're searching
-        letter_count = self.letter_map_count(letter_map)
+    def init_word_matrix(self):
+        # Letter counts of the word list as a matrix, so the words that fit
+        # in the remaining letters can be found with one comparison. It's only
+        # made once a search has enough words to use it
+        self.word_matrix = self.index.get_matrix()[[lmw[3] for lmw in self.letter_map_to_words]]
 
+    def length_start(self, letter_count, start):
         # If possible, we can jump to the part of the word list with
         # the words that have the number of letters that we're searching
         if letter_count in self.word_length_index:
             if self.word_length_index[letter_count] > start:
-                if max_t > 1:
-                    rem = start % max_t
-                    start = self.word_length_index[letter_count]
-                    start_rem = start % max_t
-                    rem_diff = rem - start_rem
-                    start += rem_diff
-                else:
-                    start = self.word_length_index[letter_count]
-
-        results = []
-
-        # If we have a small number of letters, it's faster to iterate through every possible
-        # combination of letters and see if it's an anagram of any words, although each iteration
-        # of this path is roughly 8x slower than the default path
+                start = self.word_length_index[letter_count]
+        return start
+
+    def length_stop(self, min_length):
+        # Position of the first word with fewer letters than min_length
+        for l in range(min_length - 1, 0, -1):
+            if l in self.word_length_index:
+                return self.word_length_index[l]
+        return self.letter_map_to_words_count
+
+    def add_edges(self, edges, wordi, letters_left, letter_count, next_start=None, next_stop=None, words_left=None):
+        # Add an edge to the results for each number of times this group of anagrams
+        # fits in the letters, followed by the results using only later groups. If
+        # next_start and next_stop are given, only later groups between them are used.
+        # If words_left is given, results have at most that many words, including this group
+        if next_start is None:
+            next_start = wordi + 1
+        lmw = self.letter_map_to_words[wordi]
+        guard = wordindex.PACKED_GUARD
+        times = 0
+        while True:
+            # Setting the guard bit of every letter before subtracting means
+            # the word only fits if all the guard bits are still set
+            letters_left = (letters_left | guard) - lmw[1]
+            if letters_left & guard != guard:
+                break
+            letters_left ^= guard
+            letter_count -= len(lmw[0])
+            times += 1
+            if words_left is not None and times > words_left:
+                break
+            if letters_left == 0:
+                # There are no remaining letters, so we have a result
+                if next_start == wordi + 1:
+                    edges.append((wordi, times, lmw[2], None))
+                break
+            next_words_left = None
+            if words_left is not None:
+                # Later groups are no longer than this one, so if even they can't use up
+                # the letters in the words left, neither can using this group more times
+                next_words_left = words_left - times
+                if letter_count > next_words_left * len(lmw[0]):
+                    break
+            # There are remaining letters, so we have to see what words can be found in them
+            if self.stats is not None:
+                self.stats.descend()
+            next_find = self.search_wordlist(letters_left, letter_count, next_start, next_stop, next_words_left)
+            if self.stats is not None:
+                self.stats.ascend()
+            if next_find is not None:
+                edges.append((wordi, times, lmw[2], next_find))
+
+    def search_wordlist(self, packed, letter_count, start, stop=None, words_left=None):
+        # Returns a reference to the graph of results using the words from start
+        # onwards, or None if there aren't any. With caching, the results for each
+        # set of letters are kept along with the earliest start they're complete for.
+        # If stop is given, only the words before it are used and nothing is cached.
+        # If words_left is given, only results with at most that many words are found
+        key = packed
+        if words_left is not None:
+            if words_left <= 0:
+                return None
+            key = (packed, words_left)
+        cached = None
+        cache_stop = None
+        if stop is None and self.caching_enabled:
+            cached = self.result_cache.get(key)
+            if cached is not None:
+                if cached[1] <= start:
+                    if self.stats is not None:
+                        self.stats.cache_hits += 1
+                    return resultdag.ref(cached[0], start)
+                cache_stop = cached[1]
+        if self.stats is not None:
+            if cache_stop is None:
+                self.stats.cache_misses += 1
+            else:
+                self.stats.cache_partial_hits += 1
+
+        search_start = self.length_start(letter_count, start)
+        search_stop = self.letter_map_to_words_count
+        if stop is not None:
+            search_stop = stop
+        elif cache_stop is not None:
+            search_stop = cache_stop
+        if words_left is not None:
+            # Only words long enough to use up the letters in the words left will do
+            search_stop = min(search_stop, self.length_stop(-(-letter_count // words_left)))
+
+        # Every search that isn't answered by the cache checks the deadline, so
+        # counting, which doesn't go through the top level words, stops in time too
+        self.check_deadline()
+
+        # Find the groups that fit in the letters, in whichever way should be quickest
+        letters = wordindex.packed_letters(packed)
+        strategy = self.choose_strategy(self.letter_combinations(letters), 1 << len(letters), search_stop - search_start)
+        edges = []
+        for wordi in self.find_fits(strategy, packed, letters, search_start, search_stop):
+            self.add_edges(edges, wordi, packed, letter_count, words_left=words_left)
+
+        if stop is not None:
+            return resultdag.ref(edges, start)
+
+        # The cached results carry on from where these stop
+        if cache_stop is not None:
+            edges.extend(resultdag.edges((cached[0], cache_stop)))
+
+        if self.caching_enabled:
+            self.put_cache(key, edges, start)
+
+        return resultdag.ref(edges, start)
+
+    def letter_combinations(self, letters):
         letter_combinations = 1
-        for c in letter_map.values():
+        for shift, c in letters:
             letter_combinations *= (c + 1)
-        if not toplevel and self.fast_path_enabled and letter_combinations < (self.letter_map_to_words_count - start) * self.fast_path_iter_rel_speed and cache_stop is None:
-
-            letter_index_length = len(letter_map)
-            # Mapping of index to letter
-            index_to_letter = []
+        return letter_combinations
+
+    def choose_strategy(self, letter_combinations, masks, words):
+        # Looking words up by mask is tried first. Otherwise, if we have a small number
+        # of letters, it's faster to iterate through every possible combination of letters
+        # and see if it's an anagram of any words, although each iteration of this path is
+        # roughly 8x slower than the default path, and NumPy is only worth it for enough words
+        if self.mask_buckets_enabled and masks < words * self.mask_bucket_rel_speed:
+            return 'buckets'
+        if self.fast_path_enabled and letter_combinations < words * self.fast_path_iter_rel_speed:
+            return 'combinations'
+        if self.numpy_enabled and words >= self.numpy_min_words:
+            return 'numpy'
+        return 'scan'
+
+    def find_fits(self, strategy, packed, letters, start, stop):
+        # Returns the positions of the groups from start to stop that can be made
+        # from the letters, in order
+        if strategy == 'combinations':
+            if self.stats is not None:
+                self.stats.fast_path += 1
+                self.stats.word_tests += self.letter_combinations(letters)
+
+            found = []
+            letter_index_length = len(letters)
+            # Bit shift of each letter's count in the packed letters
+            index_to_shift = [l[0] for l in letters]
             # Mapping of index to count of that letter
-            letter_max = []
-            for l in sorted(letter_map.keys()):
-                index_to_letter.append(l)
-                letter_max.append(letter_map[l])
+            letter_max = [l[1] for l in letters]
             # Index as we step through every combination of letters
             letter_index = letter_max.copy()
 
             while True:
-                
+
                 # Put together the letters we're looking at this iteration
-                letters = ''
+                letters_used = 0
+                letters_used_count = 0
                 for i in range(0, letter_index_length):
-                    letters += index_to_letter[i] * letter_index[i]
-                if letters == '':
+                    letters_used += letter_index[i] << index_to_shift[i]
+                    letters_used_count += letter_index[i]
+                if letters_used_count == 0:
                     break
-                
+
                 # Find the words that are anagrams of these letters
-                if letters in self.normalised_word_map:
-                    wordi = self.letter_map_reverse[letters]
-                    if wordi >= start:
-                        words = self.normalised_word_map[letters][2]
-                        
-                        # Calculate what letters are left over
-                        letters_left = letter_map.copy()
-                        for i in range(0, letter_index_length):
-                            l = index_to_letter[i]
-                            letters_left[l] -= letter_index[i]
-                            if letters_left[l] == 0:
-                                del letters_left[l]
-                        letters_left_count = self.letter_map_count(letters_left)
-
-                        # Store these results
-                        if letters_left_count == 0:
-                            for word in words:
-                                self.add_to_results(results, wordi, word)
-                        else:
-                            next_find = self.search_wordlist(letters_left, 0, 1, wordi, level + 1)
-                            for word in words:
-                                for n in next_find:
-                                    self.add_to_results(results, wordi, word + ' ' + n)
+                if letters_used in self.packed_reverse:
+                    wordi = self.packed_reverse[letters_used]
+                    if wordi >= start and wordi < stop:
+                        found.append(wordi)
 
                 # Decrement index
                 letter_index[-1] -= 1
@@ -197,163 +270,57 @@ class AnagramFinder():
                     else:
                         break
 
-        else:
+            found.sort()
+            return found
 
-            # Otherwise, we iterate through all the words and see if they can be made
-            # using the letters we have
+        guard = wordindex.PACKED_GUARD
+        guarded = packed | guard
+        lmws = self.letter_map_to_words
 
-            for wordi in range(start, self.letter_map_to_words_count, max_t):
-                if self.caching_enabled and cache_stop is not None and wordi >= cache_stop and key in self.result_cache:
-                    self.merge_results(results, self.result_cache[key][0])
-                    break
-                word_letter_map = self.letter_map_to_words[wordi][1]
-                if toplevel and display is not None:
-                    display(t, wordi + 1, self.letter_map_to_words_count)
-                # See if this word can be found in the letters we're searching,
-                # and if so, what letters are left over afterwards
-                found, letters_left = self.word_in_letters(word_letter_map, letter_map)
-                if found:
-                    words = self.letter_map_to_words[wordi][2]
-                    if self.letter_map_count(letters_left) == 0:
-                        # There are no remaining letters, so we have a result
-                        for word in words:
-                            self.add_to_results(results, wordi, word)
-                    else:
-                        # There are remaining letters, so we have to see what words
-                        # can be found in them, combining the results with this word
-                        next_find = self.search_wordlist(letters_left, 0, 1, wordi, level + 1)
-                        for word in words:
-                            for n in next_find:
-                                self.add_to_results(results, wordi, word + ' ' + n)
-                if toplevel and self.caching_enabled:
-                    self.clear_cache()
-
-        if toplevel and display is not None:
-            display(t, self.letter_map_to_words_count, self.letter_map_to_words_count)
-        
-        if not toplevel and self.caching_enabled:
-            if key not in self.result_cache:
-                self.result_cache[key] = [results, start, 0]
-            elif self.result_cache[key][1] > start:
-                self.result_cache[key] = [results, start, self.result_cache[key][2] + 1]
-
-        return self.results_as_list(results)
-
-    def add_to_results(self, results, i, result):
-        results.append((i, result))
-
-    def merge_results(self, results1, results2):
-        results1.extend(results2)
-
-    def results_as_list(self, results, start=0):
-        return [r[1] for r in results if r[0] >= start]
-
-    def get_cache_size(self):
-        return len(self.result_cache)
-
-    def clear_cache(self):
-        cache_size = self.get_cache_size()
-        if cache_size > self.cache_limit:
-            amount_to_remove = (cache_size - self.cache_limit) + (self.cache_limit * self.cache_clear_fraction)
-            cache_usage = {}
-            for c in self.result_cache.values():
-                n = c[2]
-                if n not in cache_usage:
-                    cache_usage[n] = 0
-                cache_usage[n] += 1
-            total_n = 0
-            remove_used = []
-            for used in sorted(cache_usage.keys()):
-                n = cache_usage[used]
-                remove_used.append(used)
-                total_n += n
-                if total_n >= amount_to_remove:
+        if strategy == 'buckets':
+            if self.stats is not None:
+                self.stats.bucket_path += 1
+
+            # Every mask made of only the letters we have, from the full mask down to none
+            found = []
+            present = wordindex.packed_to_mask(packed)
+            mask = present
+            while True:
+                if mask in self.mask_buckets:
+                    bucket = self.mask_buckets[mask]
+                    wordis = bucket[bisect_left(bucket, start):bisect_left(bucket, stop)]
+                    if self.stats is not None:
+                        self.stats.word_tests += len(wordis)
+                    for wordi in wordis:
+                        if (guarded - lmws[wordi][1]) & guard == guard:
+                            found.append(wordi)
+                if mask == 0:
                     break
-            self.result_cache = dict([(k, v) for k, v in self.result_cache.items() if v[2] not in remove_used])
-
-    def word_in_letters(self, word_letter_map, letter_map):
-        for letter in word_letter_map.keys():
-            if letter not in letter_map or word_letter_map[letter] > letter_map[letter]:
-                return False, None
-        letters_left = letter_map.copy()
-        for letter in word_letter_map.keys():
-            letters_left[letter] -= word_letter_map[letter]
-            if letters_left[letter] == 0:
-                del letters_left[letter]
-        return True, letters_left
-
-    def word_to_letter_map(self, word):
-        letter_map = {}
-        for letter in word:
-            letter = letter.lower()
-            if letter in self.allowed_letters:
-                if letter not in letter_map:
-                    letter_map[letter] = 0
-                letter_map[letter] += 1
-        return letter_map
-
-    def letter_map_count(self, letter_map):
-        return sum(letter_map.values())
-
-    def letter_map_to_key(self, letter_map):
-        return ''.join([l * n for l, n in sorted(letter_map.items())])
-
-    def sort_results(self, results):
-        new_result = set()
-        for result in results:
-            new_result.add(' '.join(sorted(result.split(' '))))
-        return sorted(list(new_result))
-
-
-def output(t, i, n):
-    line = '\r'
-    if t > 0:
-        line += ('\033[' + str(t * 8) + 'C')
-    line += "{:6.2f}%".format(i / n * 100)
-    sys.stderr.write(line)
-    sys.stderr.flush()
-
-def argument(arg):
-    if arg.startswith('--'):
-        if '=' in arg:
-            key = arg[2:arg.index('=')]
-            value = arg[arg.index('=') + 1:]
-            return (key, value)
-        else:
-            return (arg[2:], None)
-    return None
+                mask = (mask - 1) & present
+
+            found.sort()
+            return found
+
+        # Otherwise, we iterate through the words and see if they can be made
+        # using the letters we have, rejecting most on the letters they have at all
+        wordis = range(start, stop)
+        if strategy == 'numpy':
+            # Narrow the words down to the ones that fit in one comparison
+            numpy = wordindex.load_numpy()
+            if self.word_matrix is None:
+                self.init_word_matrix()
+            fits = numpy.all(self.word_matrix[start:stop] <= wordindex.packed_to_array(packed), axis=1)
+            wordis = (numpy.flatnonzero(fits) + start).tolist()
+            if self.stats is not None:
+                self.stats.numpy_path += 1
+        elif self.stats is not None:
+            self.stats.slow_path += 1
+        if self.stats is not None:
+            self.stats.word_tests += len(wordis)
+
+        missing = ~wordindex.packed_to_mask(packed)
+        return [wordi for wordi in wordis if not lmws[wordi][4] & missing and (guarded - lmws[wordi][1]) & guard == guard]
 
 
 if __name__ == '__main__':
-    a = AnagramFinder('dictionary/output.txt')
-    words = []
-    for arg in sys.argv[1:]:
-        arg_found = argument(arg)
-        if arg_found is None:
-            words.append(arg)
-        else:
-            key = arg_found[0]
-            value = arg_found[1]
-            if key == 'procs':
-                a.proc_count = int(value)
-            elif key == 'cache':
-                a.caching_enabled = True
-            elif key == 'cachesize':
-                a.cache_limit = int(value)
-            elif key == 'help':
-                print("Usage: ./anagram.py [<OPTIONS>] <WORDS>")
-                print()
-                print("Options:")
-                print("    --procs=<N>     Runs N many processes, default is 1")
-                print("    --cache         Enables cache, default is off")
-                print("    --cachesize=<N> Sets the max number of results to cache, default 1000000")
-                print("    --help          Displays this help")
-                print()
-                sys.exit()
-            else:
-                raise Exception("No such argument: {}".format(key))
-    results = a.find(''.join(words), output)
-    sys.stderr.write("\n")
-    sys.stderr.flush()
-    for result in results:
-        print(result)
+    basefinder.main(AnagramFinder('dictionary/output.txt'), 'anagram', sys.argv[1:])
@@ -1,354 +1,334 @@
 #!/usr/bin/python3
 
 import sys
-import multiprocessing
-from queue import Empty, Full
-from time import sleep
-
-
-class AnagramFinder():
-
-    def __init__(self, filename):
-        self.allowed_letters = 'abcdefghijklmnopqrstuvwxyz'
-
-        self.proc_count = 1
-
-        self.caching_enabled = False
-        self.cache_limit = 1000000
-        self.cache_clear_fraction = 0.1
-
-        self.result_batch_size = 1000
-
-        self.max_key_size = 30
-
-        # Load dictionary of words
-        self.words = []
-        f = open(filename)
-        for line in f:
-            word = line.strip()
-            self.words.append(word)
-        f.close()
-
-    def find(self, letters, display=None):
-        # Turn string into a map of each letter and the number of times it occurs
-        letter_map = self.word_to_letter_map(letters)
-        self.init_wordlist(letter_map)
-
-        args = [[letter_map]] * self.proc_count
-        results = self.multiprocess_job(self.do_proc, args, display)
-        
-        return sorted(results)
-
-    def multiprocess_job(self, target, args, display):
-        # Start a process for each set of arguments
-        max_t = len(args)
-        procs = []
-        queue_in = multiprocessing.Queue()
-        queue_out = multiprocessing.Queue()
-        for t in range(0, max_t):
-            proc = multiprocessing.Process(
-                target=target,
-                args=[t, queue_in, queue_out] + args[t],
-                daemon=True)
-            proc.start()
-            procs.append(proc)
-
-        start = 0
-        end = self.letter_map_to_words_count
-
-        if display is not None:
-            display(0, 1)
-
-        results = []
-        number_of_batches = 0
-        while start < end:
-            # Add a batch to the input queue for procs to read from
-            try:
-                batch_size = int((end - start) / max_t * 0.5)
-                if batch_size == 0:
-                    batch_size = 1
-                new_start = start + batch_size
-                if new_start > end:
-                    new_start = end
-                else:
-                    queue_in.put({'start': start, 'end': new_start}, block=False)
-                    start = new_start
-                    number_of_batches += 1
-            except Full:
-                pass
-            # Read results from queue just in case the output
-            # gets full while we're still loading up the input
-            try:
-                r = queue_out.get(block=False)
-                results.extend(r)
-            except Empty:
-                pass
-
-        # Finished, kill procs
-        for t in range(0, max_t):
-            queue_in.put({'quit': True}, block=True)
-        
-        # Read results while waiting for procs to end
-        for proc in procs:
-            while proc.is_alive():
-                if display is not None:
-                    display(number_of_batches - queue_in.qsize(), number_of_batches)
-                sleep(0.001)
-                while True:
-                    try:
-                        r = queue_out.get(block=False)
-                        results.extend(r)
-                    except Empty:
-                        break
-
+import wordindex
+import resultdag
+import diskmemo
+import basefinder
+from basefinder import option
+
+
+# The word tree engine. The words are kept in a tree by their keys, which is walked
+# only along letters that are left, skipping every branch needing a letter that
+# isn't. The cache refers to words by their keys, so can be kept from one phrase to
+# the next, and results can also be kept on disk between runs, see diskmemo.
+
+
+class AnagramFinder(basefinder.BaseFinder):
+
+    ENGINE_OPTIONS = [
+        option('memo', 'memo_enabled', True,
+               "--memo[=<FILE>]", "Keeps results for sets of letters on disk for later runs, next to the dictionary by default"),
+        option('memo', 'memo_file', lambda value: value, None, None),
+        option('memosize', 'memo_max_bytes', lambda value: int(value) * 1000000,
+               "--memosize=<N>", "Sets the most MB of results to keep on disk, default 100"),
+        option('memopolicy', 'memo_policy', lambda value: value,
+               "--memopolicy=<NAME>", "Takes out the least recently used (lru) or least used (lfu) results, default lru"),
+    ]
+
+    def __init__(self, filename, index=None):
+        super().__init__(filename, index)
+
+        # Keep the results for sets of letters on disk as well, so later runs can use
+        # them, see diskmemo. It's opened the first time it's needed
+        self.memo_enabled = False
+        self.memo_file = None
+        self.memo_max_bytes = 100000000
+        self.memo_policy = 'lru'
+        self.memo = None
+
+    def init_search(self, letter_map):
+        # The word tree is made once for the search, and the words that fit in what's
+        # left of the letters, with keys after a given key, are found by walking it
+        self.init_wordtree(self.letter_map_to_words)
+
+    def search_all(self):
+        results = self.search_wordtree(self.packed, '', words_left=self.words_left())
+        if self.memo_enabled:
+            self.get_memo().flush()
         return results
 
-    def do_proc(self, t, queue_in, queue_out, letter_map):
-        self.result_cache = {}
-        while True:
-            message = queue_in.get(block=True)
-            if 'start' in message:
-                start = message['start']
-                end = message['end']
-
-                results = self.search_wordlist(letter_map, start, end)
-                for i in range(0, len(results), self.result_batch_size):
-                    next_i = i + self.result_batch_size
-                    if next_i >= len(results):
-                        queue_out.put(results[i:])
-                    else:
-                        queue_out.put(results[i:next_i])
-            elif 'quit' in message:
-                break
-
-    def init_wordlist(self, letter_map):
-        # Create a list of all words organised by the letters they contain,
-        # so words that are anagrams of each other are grouped together
-        self.normalised_word_map = {}
-        for word in self.words:
-            word_letter_map = self.word_to_letter_map(word)
-            found, letters_left = self.word_in_letters(word_letter_map, letter_map)
-            if found:
-                key = self.letter_map_to_key(word_letter_map)
-                if key not in self.normalised_word_map:
-                    self.normalised_word_map[key] = (key, word_letter_map, [])
-                self.normalised_word_map[key][2].append(word)
-
-        # Sort the word list by word length, longest words first
-        self.letter_map_to_words = sorted(self.normalised_word_map.values(), key=lambda x: len(x[0]), reverse=True)
+    def close(self):
+        super().close()
+        if self.memo is not None:
+            self.memo.close()
+            self.memo = None
+
+    def get_memo(self):
+        if self.memo is None:
+            self.memo = diskmemo.DiskMemo(self.filename, self.memo_file, self.memo_max_bytes, self.memo_policy)
+        return self.memo
+
+    def worker_settings(self):
+        settings = super().worker_settings()
+        settings.update({
+            'memo_enabled': self.memo_enabled,
+            'memo_file': self.memo_file,
+            'memo_max_bytes': self.memo_max_bytes,
+            'memo_policy': self.memo_policy,
+        })
+        return settings
+
+    def subtree_start(self, wordi):
+        # The words after each top level word are split up in key order
+        return self.word_key_rank[wordi] + 1
+
+    def init_wordlist_ids(self, ids):
+        super().init_wordlist_ids(ids)
+        self.memo_scope = self.word_scope()
+        self.init_key_ranks()
+
+    def init_key_ranks(self):
+        # The position of each word in key order, so the words after a word can be split up
+        self.sorted_keys = sorted([lmw[0] for lmw in self.letter_map_to_words])
+        key_rank = dict([(key, i) for i, key in enumerate(self.sorted_keys)])
+        self.word_key_rank = [key_rank[lmw[0]] for lmw in self.letter_map_to_words]
+        self.max_key_length = max([len(key) for key in self.sorted_keys], default=0)
+        # The letters and words of each group by key, made when the memo needs them
+        self.key_groups = None
+
+    def add_words(self, ids):
+        # Add groups to the word list and the word tree, so a search with more
+        # letters can carry on from this one without going through the dictionary
+        letter_map_list = self.letter_map_list(ids)
+        self.word_ids = self.word_ids + ids
+        self.letter_map_to_words = self.letter_map_to_words + letter_map_list
+        self.letter_map_to_words_count = len(self.letter_map_to_words)
+        self.init_key_ranks()
+        self.add_to_wordtree(letter_map_list)
+
+    def remove_words(self, packed):
+        # Drop the groups that no longer fit in the letters from the word list. Their
+        # branches of the word tree are left, as it's only walked along letters we have
+        guard = wordindex.PACKED_GUARD
+        guarded = packed | guard
+        self.letter_map_to_words = [lmw for lmw in self.letter_map_to_words if (guarded - lmw[1]) & guard == guard]
+        self.word_ids = [lmw[3] for lmw in self.letter_map_to_words]
         self.letter_map_to_words_count = len(self.letter_map_to_words)
+        self.init_key_ranks()
 
     def init_wordtree(self, letter_map_list):
-        self.word_tree = {}
+        self.word_tree = {'children': {}}
+        self.add_to_wordtree(letter_map_list)
+
+    def add_to_wordtree(self, letter_map_list):
+        # Each node of the tree maps the bit shift of a letter to the next node, and
+        # has the mask of the letters every word below it still needs from there on,
+        # including its own letter, so a whole branch can be skipped once we run out
+        # of any of them
+        all_letters = (1 << wordindex.LETTER_COUNT) - 1
         for lmw in letter_map_list:
             tree_pointer = self.word_tree
             for i, l in enumerate(lmw[0]):
-                if l not in tree_pointer:
-                    tree_pointer[l] = {}
-                tree_pointer = tree_pointer[l]
-                tree_pointer['key'] = lmw[0][0:i + 1]
-            tree_pointer['letter_map'] = lmw[1]
+                shift = (ord(l) - 97) * 8
+                if shift not in tree_pointer['children']:
+                    tree_pointer['children'][shift] = {'key': lmw[0][0:i + 1], 'children': {}, 'needs': all_letters}
+                tree_pointer = tree_pointer['children'][shift]
+                tree_pointer['needs'] &= wordindex.key_to_mask(lmw[0][i:])
+            tree_pointer['packed'] = lmw[1]
             tree_pointer['words'] = lmw[2]
 
-    def search_wordlist(self, letter_map, start, end):
-        results = []
-
-        for wordi in range(start, end):
-            word_letter_map = self.letter_map_to_words[wordi][1]
-            # See if this word can be found in the letters we're searching,
-            # and if so, what letters are left over afterwards
-            found, letters_left = self.word_in_letters(word_letter_map, letter_map)
-            if found:
-                words = self.letter_map_to_words[wordi][2]
-                word_key = self.letter_map_to_words[wordi][0]
-                if len(letters_left) == 0:
-                    # There are no remaining letters, so we have a result
-                    for word in words:
-                        results.append(word)
-                else:
-                    # Make the word tree, using only words that can be made from the remaining letters
-                    new_letter_map_list = []
-                    for lmw in self.letter_map_to_words:
-                        if lmw[0] >= word_key:
-                            new_found, nl = self.word_in_letters(lmw[1], letters_left)
-                            if new_found:
-                                new_letter_map_list.append(lmw)
-                    self.init_wordtree(new_letter_map_list)
-
-                    # There are remaining letters, so we have to see what words
-                    # can be found in them, combining the results with this word
-                    next_results, next_results_start = self.search_wordtree(letters_left, word_key)
-                    for next_result_block in next_results:
-                        if next_results_start is None or next_result_block[0] >= next_results_start:
-                            for word in words:
-                                for next_result in next_result_block[1]:
-                                    if word_key != next_result_block[0] or next_result >= word:
-                                        results.append(' '.join(sorted((word + ' ' + next_result).split(' '))))
-
-            if self.caching_enabled:
-                self.clear_cache()
-
-        return results
-
-    def search_wordtree(self, letter_map, start_key):
-        key = self.letter_map_to_key(letter_map)
+    def search_part(self, wordi, sub_start=None, sub_stop=None):
+        # The results starting with the word wordi. If sub_start and sub_stop are
+        # given, only words between those positions in key order come next, so
+        # the search below one word can be split into parts
+        edges = []
+        guard = wordindex.PACKED_GUARD
+        lmw = self.letter_map_to_words[wordi]
+
+        # See if this word can be found in the letters we're searching,
+        # and if so, what letters are left over afterwards
+        letters_left = (self.packed | guard) - lmw[1]
+        if letters_left & guard == guard:
+            letters_left ^= guard
+            if sub_start is None or sub_start == self.word_key_rank[wordi] + 1:
+                start_key = None
+            else:
+                start_key = self.rank_to_key(sub_start)
+            stop_key = None if sub_stop is None else self.rank_to_key(sub_stop)
+            self.add_edges(edges, lmw[0], lmw[1], lmw[2], letters_left, start_key, stop_key, self.words_left())
+            resultdag.sort_edges(edges)
+
+        self.check_deadline()
+        if self.memo_enabled:
+            self.get_memo().flush()
+        return resultdag.ref(edges, '')
+
+    def rank_to_key(self, rank):
+        # The key at this position in key order, or None past the end
+        if rank < self.letter_map_to_words_count:
+            return self.sorted_keys[rank]
+        return None
+
+    def add_edges(self, edges, word_key, word_packed, words, letters_left, next_key=None, next_stop_key=None, words_left=None):
+        # Add an edge to the results for each number of times this group of anagrams
+        # fits in the letters, followed by the results using only groups with later
+        # keys. The letters left are after using the group once. If next_key is
+        # given, only groups with keys from there on are used, and results that
+        # are only this group are left out. Groups from next_stop_key on are never used.
+        # If words_left is given, results have at most that many words, including this group
+        guard = wordindex.PACKED_GUARD
+        alone = next_key is None
+        if next_key is None:
+            # The smallest key that comes after this one
+            next_key = word_key + 'a'
+        times = 1
+        while True:
+            if words_left is not None and times > words_left:
+                break
+            if letters_left == 0:
+                # There are no remaining letters, so we have a result
+                if alone:
+                    edges.append((word_key, times, words, None))
+                break
+            # There are remaining letters, so we have to see what words can be found in them
+            if self.stats is not None:
+                self.stats.descend()
+            next_find = self.search_wordtree(letters_left, next_key, next_stop_key, None if words_left is None else words_left - times)
+            if self.stats is not None:
+                self.stats.ascend()
+            if next_find is not None:
+                edges.append((word_key, times, words, next_find))
+            letters_left = (letters_left | guard) - word_packed
+            if letters_left & guard != guard:
+                break
+            letters_left ^= guard
+            times += 1
+
+    def search_wordtree(self, packed, start_key, stop_key=None, words_left=None):
+        # Returns a reference to the graph of results using words with keys from
+        # start_key onwards, or None if there aren't any. With caching, the results
+        # for each set of letters are kept along with the earliest key they're complete for.
+        # If stop_key is given, only the words with keys before it are used and nothing is cached.
+        # If words_left is given, only results with at most that many words are found
+        key = packed
+        if words_left is not None:
+            # Give up if even the longest words can't use up the letters in the words left
+            if words_left <= 0 or sum(packed.to_bytes(wordindex.LETTER_COUNT, 'little')) > words_left * self.max_key_length:
+                return None
+            if words_left == 1:
+                return self.search_whole_word(packed, start_key, stop_key)
+            key = (packed, words_left)
+        cached = None
         cache_stop_key = None
-        if self.caching_enabled and key in self.result_cache:
-            self.result_cache[key][2] += 1
-            if self.result_cache[key][1] <= start_key:
-                return self.result_cache[key][0], start_key
+        if stop_key is None and self.caching_enabled:
+            cached = self.result_cache.get(key)
+            if cached is not None:
+                if cached[1] <= start_key:
+                    if self.stats is not None:
+                        self.stats.cache_hits += 1
+                    return resultdag.ref(cached[0], start_key)
+                cache_stop_key = cached[1]
+        if self.stats is not None:
+            if cache_stop_key is None:
+                self.stats.cache_misses += 1
             else:
-                cache_stop_key = self.result_cache[key][1]
+                self.stats.cache_partial_hits += 1
+
+        if stop_key is None and cache_stop_key is None and self.memo_enabled:
+            found = self.memo_edges(packed, start_key, words_left)
+            if found is not None:
+                memo_start_key, edges = found
+                if self.caching_enabled:
+                    self.put_cache(key, edges, memo_start_key)
+                return resultdag.ref(edges, start_key)
 
-        results = []
+        # Every search that isn't answered by the cache checks the deadline, so
+        # counting, which doesn't go through the top level words, stops in time too
+        self.check_deadline()
+
+        edges = []
 
         find_word_results = []
-        self.find_words(letter_map, start_key, cache_stop_key, self.word_tree, find_word_results)
-
-        for find_word_result in find_word_results:
-            letters_left = find_word_result[0]
-            tree_pointer = find_word_result[1]
-            words = tree_pointer['words']
-            word_key = tree_pointer['key']
-            if len(letters_left) == 0:
-                results.append((word_key, words))
-            else:
-                next_results, next_results_start = self.search_wordtree(letters_left, word_key)
-                result_block = []
-                for next_result_block in next_results:
-                    if next_results_start is None or next_result_block[0] >= next_results_start:
-                        for word in words:
-                            for next_result in next_result_block[1]:
-                                if word_key != next_result_block[0] or next_result >= word:
-                                    result_block.append(word + ' ' + next_result)
-                if len(result_block) > 0:
-                    results.append((word_key, result_block))
-
-        if cache_stop_key:
-            results.extend(self.result_cache[key][0])
+        missing = ~wordindex.packed_to_mask(packed)
+        self.find_words(packed, missing, start_key, cache_stop_key if stop_key is None else stop_key, self.word_tree, find_word_results)
 
-        if self.caching_enabled:
-            if key not in self.result_cache:
-                self.result_cache[key] = [results, start_key, 0]
-            elif self.result_cache[key][1] > start_key:
-                self.result_cache[key] = [results, start_key, self.result_cache[key][2] + 1]
+        for letters_left, tree_pointer in find_word_results:
+            self.add_edges(edges, tree_pointer['key'], tree_pointer['packed'], tree_pointer['words'], letters_left, words_left=words_left)
+        resultdag.sort_edges(edges)
+
+        if stop_key is not None:
+            return resultdag.ref(edges, start_key)
 
-        return results, None
+        # The cached results carry on from where these stop
+        if cache_stop_key is not None:
+            edges.extend(resultdag.edges((cached[0], cache_stop_key)))
 
-    def find_words(self, letter_map, start_key, stop_key, tree_pointer, results):
+        if self.caching_enabled:
+            self.put_cache(key, edges, start_key)
+        if self.memo_enabled:
+            self.get_memo().put(self.memo_key(packed, words_left), start_key,
+                                ' '.join(['{}:{}'.format(edge[0], edge[1]) for edge in edges]))
+
+        return resultdag.ref(edges, start_key)
+
+    def memo_key(self, packed, words_left):
+        return '{}|{:x}|{}'.format(self.memo_scope, packed, '' if words_left is None else words_left)
+
+    def memo_edges(self, packed, start_key, words_left):
+        # Returns the earliest key the memo has the results for the letters from,
+        # and their edges, if that's no later than start_key, otherwise None. Only the
+        # group and times of each edge are kept, and the results that follow are
+        # looked up again, from the cache, the memo, or by searching
+        found = self.get_memo().get(self.memo_key(packed, words_left))
+        if found is None or found[0] > start_key:
+            if self.stats is not None:
+                self.stats.memo_misses += 1
+            return None
+        if self.stats is not None:
+            self.stats.memo_hits += 1
+        if self.key_groups is None:
+            self.key_groups = dict([(lmw[0], (lmw[1], lmw[2])) for lmw in self.letter_map_to_words])
+
+        memo_start_key, memo_edges = found
+        edges = []
+        for edge in memo_edges.split(' ') if memo_edges != '' else []:
+            word_key, times = edge.split(':')
+            times = int(times)
+            if word_key not in self.key_groups:
+                return None
+            word_packed, words = self.key_groups[word_key]
+            letters_left = packed - word_packed * times
+            next_find = None
+            if letters_left != 0:
+                next_find = self.search_wordtree(letters_left, word_key + 'a', None, None if words_left is None else words_left - times)
+                if next_find is None:
+                    return None
+            edges.append((word_key, times, words, next_find))
+        return memo_start_key, edges
+
+    def search_whole_word(self, packed, start_key, stop_key=None):
+        # With one word left, only a group using up all the letters will do,
+        # so follow the letters down the tree rather than walking all of it
+        key = wordindex.packed_to_key(packed)
+        if key < start_key or (stop_key is not None and key >= stop_key):
+            return None
+        tree_pointer = self.word_tree
+        for l in key:
+            shift = (ord(l) - 97) * 8
+            if shift not in tree_pointer['children']:
+                return None
+            tree_pointer = tree_pointer['children'][shift]
+        if 'words' not in tree_pointer:
+            return None
+        return resultdag.ref([(key, 1, tree_pointer['words'], None)], start_key)
+
+    def find_words(self, packed, missing, start_key, stop_key, tree_pointer, results):
+        # Walk the tree, only following letters we still have, and only into
+        # branches that can have keys from start_key up to stop_key. The mask
+        # of letters we didn't have to start with rules out most branches in one go
+        if self.stats is not None:
+            self.stats.word_tests += 1
         if 'words' in tree_pointer and start_key <= tree_pointer['key']:
-            results.append((letter_map, tree_pointer))
-        
-        for l in letter_map:
-            if l in tree_pointer:
-                next_key = tree_pointer[l]['key']
-                if start_key <= self.key_assume_late(next_key) and (stop_key is None or stop_key > next_key):
-                    new_letter_map = letter_map.copy()
-                    new_letter_map[l] -= 1
-                    if new_letter_map[l] == 0:
-                        del new_letter_map[l]
-                    self.find_words(new_letter_map, start_key, stop_key, tree_pointer[l], results)
-
-    def clear_cache(self):
-        cache_size = len(self.result_cache)
-        if cache_size > self.cache_limit:
-            amount_to_remove = (cache_size - self.cache_limit) + (self.cache_limit * self.cache_clear_fraction)
-            cache_usage = {}
-            for c in self.result_cache.values():
-                n = c[2]
-                if n not in cache_usage:
-                    cache_usage[n] = 0
-                cache_usage[n] += 1
-            total_n = 0
-            remove_used = []
-            for used in sorted(cache_usage.keys()):
-                n = cache_usage[used]
-                remove_used.append(used)
-                total_n += n
-                if total_n >= amount_to_remove:
-                    break
-            self.result_cache = dict([(k, v) for k, v in self.result_cache.items() if v[2] not in remove_used])
-
-    def word_in_letters(self, word_letter_map, letter_map):
-        for letter in word_letter_map.keys():
-            if letter not in letter_map or word_letter_map[letter] > letter_map[letter]:
-                return False, None
-        return True, self.letter_map_subtract(letter_map, word_letter_map)
-
-    def word_to_letter_map(self, word):
-        letter_map = {}
-        for letter in word:
-            letter = letter.lower()
-            if letter in self.allowed_letters:
-                if letter not in letter_map:
-                    letter_map[letter] = 0
-                letter_map[letter] += 1
-        return letter_map
-
-    def letter_map_to_key(self, letter_map):
-        key = ''
-        for l in sorted(letter_map):
-            key += l * letter_map[l]
-        return key
-
-    def letter_map_subtract(self, letter_map1, letter_map2):
-        new_letter_map = letter_map1.copy()
-        for letter in letter_map2.keys():
-            new_letter_map[letter] -= letter_map2[letter]
-            if new_letter_map[letter] == 0:
-                del new_letter_map[letter]
-        return new_letter_map
-
-    def key_assume_late(self, key):
-        return key + '|' * (self.max_key_size - len(key))
-
-
-def output(i, n):
-    line = '\r' + "{:6.2f}%".format(i / n * 100)
-    sys.stderr.write(line)
-    sys.stderr.flush()
-
-def argument(arg):
-    if arg.startswith('--'):
-        if '=' in arg:
-            key = arg[2:arg.index('=')]
-            value = arg[arg.index('=') + 1:]
-            return (key, value)
-        else:
-            return (arg[2:], None)
-    return None
+            results.append((packed, tree_pointer))
+
+        for shift, next_pointer in tree_pointer['children'].items():
+            if not next_pointer['needs'] & missing and (packed >> shift) & wordindex.PACKED_MAX_COUNT:
+                next_key = next_pointer['key']
+                # Every key in this branch starts with next_key
+                if next_key >= start_key[:len(next_key)] and (stop_key is None or stop_key > next_key):
+                    self.find_words(packed - (1 << shift), missing, start_key, stop_key, next_pointer, results)
 
 
 if __name__ == '__main__':
-    a = AnagramFinder('dictionary/output.txt')
-    words = []
-    for arg in sys.argv[1:]:
-        arg_found = argument(arg)
-        if arg_found is None:
-            words.append(arg)
-        else:
-            key = arg_found[0]
-            value = arg_found[1]
-            if key == 'procs':
-                a.proc_count = int(value)
-            elif key == 'cache':
-                a.caching_enabled = True
-            elif key == 'cachesize':
-                a.cache_limit = int(value)
-            elif key == 'help':
-                print("Usage: ./anagram.py [<OPTIONS>] <WORDS>")
-                print()
-                print("Options:")
-                print("    --procs=<N>     Runs N many processes, default is 1")
-                print("    --cache         Enables cache, default is off")
-                print("    --cachesize=<N> Sets the max number of results to cache, default 1000000")
-                print("    --help          Displays this help")
-                print()
-                sys.exit()
-            else:
-                raise Exception("No such argument: {}".format(key))
-    results = a.find(''.join(words), output)
-    sys.stderr.write("\n")
-    sys.stderr.flush()
-    for result in results:
-        print(result)
+    basefinder.main(AnagramFinder('dictionary/output.txt'), 'anagram2', sys.argv[1:])
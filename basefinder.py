@@ -0,0 +1,541 @@
+import sys
+import json
+import cProfile
+import wordindex
+import resultdag
+import workpool
+import searchstats
+import constraints
+import ranking
+import resultcache
+from itertools import islice
+from time import time
+
+
+# What every engine has in common: its settings, loading the dictionary index and
+# setting up the word list for a search, the worker processes, the cache, the limits
+# on the results, stats, and the command line. An engine subclasses BaseFinder and
+# finds the results for the letters and word list set up by prepare, see anagram
+# and anagram2. To fit in, it implements:
+#   init_search(letter_map)   set up anything else the search needs, once prepare has
+#                             set up the word list, the cache and the packed letters
+#   search_part(wordi, sub_start=None, sub_stop=None)
+#                             a reference to the graph of results starting with the
+#                             word wordi, or None, see resultdag. If sub_start and
+#                             sub_stop are given, only the words between those
+#                             positions come next, see workpool
+#   subtree_start(wordi)      the position of the first word that can follow wordi
+#   search_all()              a reference to the graph of all the results, or None
+# and can override toplevel_start, to skip words that can't start a result. Engines
+# whose cache refers to words by their place in the word list set cache_keepable
+# to False, so the cache isn't kept from one phrase to the next.
+
+
+# The settings every engine has, which AnagramFinder hands on to the engine it picks, see engines
+SETTINGS = [
+    'proc_count',
+    'start_method',
+    'task_time_slice',
+    'subtree_splits',
+    'caching_enabled',
+    'cache_max_bytes',
+    'cache_policy',
+    'keep_cache',
+    'deadline',
+    'max_words',
+    'min_word_length',
+    'max_word_length',
+    'required_words',
+    'excluded_words',
+    'stats_enabled',
+    'profile_dir',
+    'numpy_enabled',
+]
+
+
+def option(name, setting, value, usage, description):
+    # A command line option that sets a setting. value turns the option's value into
+    # the setting's, or is the setting's value if it isn't callable. Options without
+    # usage aren't shown in the help
+    return (name, setting, value, usage, description)
+
+
+# Options for the settings every engine has. An engine adds its own in ENGINE_OPTIONS
+OPTIONS = [
+    option('procs', 'proc_count', int, "--procs=<N>", "Runs N many processes, default is 1"),
+    option('startmethod', 'start_method', lambda value: value, "--startmethod=<NAME>", "Starts processes with fork, spawn or forkserver"),
+    option('cache', 'caching_enabled', True, None, None),
+    option('nocache', 'caching_enabled', False, "--nocache", "Disables cache, default is on"),
+    option('cachesize', 'cache_max_bytes', lambda value: int(value) * 1000000,
+           "--cachesize=<N>", "Sets roughly the most MB the cache can take up, default 500"),
+    option('cachepolicy', 'cache_policy', lambda value: value,
+           "--cachepolicy=<NAME>", "Once the cache is full, takes out the lru, lfu or size (biggest) entries first"),
+    option('maxwords', 'max_words', int, "--maxwords=<N>", "Only finds results with at most N words"),
+    option('minlength', 'min_word_length', int, "--minlength=<N>", "Only uses words with at least N letters"),
+    option('maxlength', 'max_word_length', int, "--maxlength=<N>", "Only uses words with at most N letters"),
+    option('require', 'required_words', lambda value: value.split(','),
+           "--require=<WORDS>", "Only finds results with all these comma separated words"),
+    option('exclude', 'excluded_words', lambda value: set([word.lower() for word in value.split(',')]),
+           "--exclude=<WORDS>", "Never uses these comma separated words"),
+    option('nonumpy', 'numpy_enabled', False, "--nonumpy", "Filters words without NumPy, even if it's installed"),
+    option('stats', 'stats_enabled', True,
+           "--stats", "Prints what the search did to stderr, or adds it to each line with --batch"),
+    option('profile', 'profile_dir', lambda value: value, "--profile=<DIR>", "Writes cProfile output for this process and each worker to DIR"),
+]
+
+# Options for what to print, rather than how to search
+MODE_OPTIONS = [
+    ("--stream", "Prints results as they're found, unsorted"),
+    ("--count", "Prints the number of results instead of the results"),
+    ("--limit=<N>", "Stops after finding N results"),
+    ("--top=<N>", "Prints the N best results: fewest words first, then the longest words, then the most used"),
+    ("--batch=<FILE>", "Finds anagrams of each line of FILE, or stdin if -, as JSON lines"),
+]
+
+
+class BaseFinder():
+
+    ENGINE_OPTIONS = []
+
+    cache_keepable = True
+
+    def __init__(self, filename, index=None):
+        self.allowed_letters = 'abcdefghijklmnopqrstuvwxyz'
+
+        self.filename = filename
+
+        self.proc_count = 1
+        self.pool = None
+        # How worker processes are started, see multiprocessing, or None for the default
+        self.start_method = None
+
+        # How long a worker spends on a task before handing back what's left,
+        # and how many parts the search below each word is split into for that
+        self.task_time_slice = 0.2
+        self.subtree_splits = 4
+
+        self.caching_enabled = True
+        # Roughly how much memory the cache can take up, and which entries go once it's full, see resultcache
+        self.cache_max_bytes = 500000000
+        self.cache_policy = 'lru'
+        self.result_cache = None
+        self.cache_scope = None
+        # The results for a set of letters don't depend on the phrase they came
+        # from, so with this set the cache is kept from one search to the next,
+        # if the engine can keep it
+        self.keep_cache = False
+
+        # Time after which a search is abandoned, if set
+        self.deadline = None
+
+        # Limits on the results, see constraints: the most words in a result, the
+        # shortest and longest words to use, words every result has, and words never used
+        self.max_words = None
+        self.min_word_length = None
+        self.max_word_length = None
+        self.required_words = []
+        self.excluded_words = set()
+
+        # Keep stats for each search, see searchstats, and profile the
+        # worker processes into this directory, if set
+        self.stats_enabled = False
+        self.stats = None
+        self.profile_dir = None
+
+        # Use NumPy to filter candidate words, if it's installed
+        self.numpy_enabled = wordindex.NUMPY_INSTALLED
+
+        # Load the dictionary index, building it if the dictionary has changed,
+        # unless it's given, so finders for the same dictionary can share one
+        self.index = wordindex.load_index(filename) if index is None else index
+        # How often each word is used, loaded the first time results are ranked
+        self.word_frequencies = None
+
+    def options(self):
+        return OPTIONS + self.ENGINE_OPTIONS
+
+    def set_option(self, entry, value):
+        name, setting, convert, usage, description = entry
+        setattr(self, setting, convert(value) if callable(convert) else convert)
+
+    def find(self, letters, display=None, limit=None):
+        return sorted(self.find_iter(letters, display, limit))
+
+    def find_iter(self, letters, display=None, limit=None):
+        start_time = time()
+        self.prepare(letters)
+        if self.packed == 0:
+            yield from islice(constraints.required_only(self.required_words, self.max_words), limit)
+            return
+        if len(self.required_words) == 0:
+            yield from self.search_iter(display, limit, start_time)
+            return
+        for result in self.search_iter(display, limit, start_time):
+            yield constraints.add_required(result, self.required_words)
+
+    def search_iter(self, display=None, limit=None, start_time=None):
+        # Yields the results for the letters and word list already set up
+        if start_time is None:
+            start_time = time()
+
+        # Results are yielded as each top level word, or part of one, is
+        # finished with, and the search stops once there are enough of them
+        if self.proc_count == 1:
+            jobs = self.search_toplevel(display)
+        else:
+            jobs = self.get_pool().run(wordindex.packed_to_key(self.packed), self.word_ids, self.worker_settings(),
+                                       self.toplevel_start(), self.letter_map_to_words_count, limit, display, self.stats)
+        try:
+            found = 0
+            for results in jobs:
+                if limit is not None:
+                    results = list(islice(results, limit - found))
+                    found += len(results)
+                yield from results
+                if limit is not None and found >= limit:
+                    return
+        finally:
+            jobs.close()
+            if self.stats is not None:
+                self.stats.elapsed = time() - start_time
+
+    def count(self, letters):
+        start_time = time()
+        self.prepare(letters)
+        if self.packed == 0:
+            return len(constraints.required_only(self.required_words, self.max_words))
+        return self.search_count(start_time)
+
+    def search_count(self, start_time=None):
+        if start_time is None:
+            start_time = time()
+
+        # Count the results in the graph of results, without putting any together
+        results = self.search_all()
+        n = 0 if results is None else resultdag.count(results, {})
+        if self.stats is not None:
+            self.stats.elapsed = time() - start_time
+        return n
+
+    def find_top(self, letters, k, score=None):
+        # The k best results, best first, see ranking. score, if given, is called
+        # with each word and how often it's used, and a result's score is the sum
+        # of its words' scores
+        start_time = time()
+        self.prepare(letters)
+        if self.packed == 0:
+            return constraints.required_only(self.required_words, self.max_words)[:k]
+        if self.word_frequencies is None:
+            self.word_frequencies = ranking.load_frequencies(self.index, self.filename)
+
+        top = ranking.top(self.letter_map_to_words, self.packed, k, ranking.word_scorer(score, self.word_frequencies), self.words_left())
+        if self.stats is not None:
+            self.stats.elapsed = time() - start_time
+        return [constraints.add_required(' '.join(sorted(words)), self.required_words) for result_score, words in top]
+
+    def find_many(self, phrases, limit=None):
+        # Yields each phrase along with its results, sharing the dictionary,
+        # the worker processes and, if the engine can keep it, the cache
+        # between all of them
+        keep_cache = self.keep_cache
+        self.keep_cache = True
+        try:
+            for phrase in phrases:
+                yield phrase, self.find(phrase, limit=limit)
+        finally:
+            self.keep_cache = keep_cache
+
+    def count_many(self, phrases):
+        keep_cache = self.keep_cache
+        self.keep_cache = True
+        try:
+            for phrase in phrases:
+                yield phrase, self.count(phrase)
+        finally:
+            self.keep_cache = keep_cache
+
+    def prepare(self, letters, ids=None):
+        # Turn string into a map of each letter and the number of times it occurs.
+        # Given ids, the letters and the word list have been worked out already, see
+        # workpool, otherwise the required words are taken out of the letters first
+        letter_map = self.word_to_letter_map(letters)
+        if ids is None:
+            packed = constraints.remove_required(wordindex.key_to_packed(self.letter_map_to_key(letter_map)), self.required_words)
+            letter_map = self.word_to_letter_map(wordindex.packed_to_key(packed))
+            self.init_wordlist(letter_map)
+        else:
+            self.init_wordlist_ids(ids)
+        self.reset_stats()
+
+        # The cache is only kept while the words that can be used stay the same
+        if not (self.keep_cache and self.cache_keepable) or self.result_cache is None or self.cache_scope != self.word_scope():
+            self.init_cache()
+        self.packed = wordindex.key_to_packed(self.letter_map_to_key(letter_map))
+        self.init_search(letter_map)
+
+    def reset_stats(self):
+        self.stats = searchstats.SearchStats() if self.stats_enabled else None
+        if self.stats is not None:
+            self.stats.candidates = self.letter_map_to_words_count
+
+    def get_pool(self):
+        # The worker processes are kept between searches, so they only load the dictionary once
+        if self.pool is not None and (self.pool.proc_count, self.pool.start_method) != (self.proc_count, self.start_method):
+            self.close()
+        if self.pool is None:
+            self.pool = workpool.WorkPool(type(self), self.filename, self.proc_count, self.start_method)
+        return self.pool
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.close()
+            self.pool = None
+
+    def worker_settings(self):
+        return {
+            'caching_enabled': self.caching_enabled,
+            'cache_max_bytes': self.cache_max_bytes,
+            'cache_policy': self.cache_policy,
+            'keep_cache': self.keep_cache,
+            'numpy_enabled': self.numpy_enabled,
+            'deadline': self.deadline,
+            'task_time_slice': self.task_time_slice,
+            'subtree_splits': self.subtree_splits,
+            'stats_enabled': self.stats_enabled,
+            'profile_dir': self.profile_dir,
+            'max_words': self.max_words,
+            'min_word_length': self.min_word_length,
+            'max_word_length': self.max_word_length,
+            'required_words': self.required_words,
+            'excluded_words': self.excluded_words,
+        }
+
+    def search_toplevel(self, display=None):
+        # Search through the words, yielding the results for each word as
+        # soon as it's finished with. The results are only put together as
+        # they're read
+        for wordi in range(self.toplevel_start(), self.letter_map_to_words_count):
+            if display is not None:
+                display(wordi + 1, self.letter_map_to_words_count)
+            results = self.search_part(wordi)
+            if results is not None:
+                yield resultdag.results(results)
+
+        if display is not None:
+            display(1, 1)
+
+    def toplevel_start(self):
+        # Position of the first word that can start a result
+        return 0
+
+    def run_task(self, task, limit):
+        # Runs a task from the pool in a worker, see workpool. The words after each
+        # top level word are searched in parts, and if the task runs out of time,
+        # what's left is handed back. Returns the results, what's left, and how
+        # many top level words were done
+        start, stop, sub_start, sub_stop = task
+        end_time = time() + self.task_time_slice
+        results = []
+        words_done = 0
+        for wordi in range(start, stop):
+            word_size = self.letter_map_to_words_count - self.subtree_start(wordi)
+            if sub_start is None:
+                parts = workpool.split_range(self.subtree_start(wordi), self.letter_map_to_words_count, self.subtree_splits)
+            else:
+                parts = workpool.split_range(sub_start, sub_stop, self.subtree_splits)
+            for part, (lo, hi) in enumerate(parts):
+                part_results = self.search_part(wordi, lo, hi)
+                if part_results is not None:
+                    found = resultdag.results(part_results)
+                    if limit is not None:
+                        found = islice(found, limit - len(results))
+                    results.extend(found)
+                words_done += (hi - lo) / word_size if word_size > 0 else 1
+                if limit is not None and len(results) >= limit:
+                    return results, [], words_done
+
+                if time() > end_time:
+                    leftover = []
+                    if part < len(parts) - 1:
+                        leftover.append((wordi, wordi + 1, parts[part + 1][0], parts[-1][1]))
+                    if wordi < stop - 1:
+                        leftover.append((wordi + 1, stop, None, None))
+                    if len(leftover) > 0:
+                        return results, leftover, words_done
+        return results, [], words_done
+
+    def init_wordlist(self, letter_map):
+        # Create a list of all words organised by the letters they contain,
+        # so words that are anagrams of each other are grouped together.
+        # The index has them grouped already, sorted by word length, longest words first,
+        # and if the dictionary says how often words are used, the most used first
+        ids = self.index.candidates(letter_map, self.numpy_enabled)
+        ids = constraints.filter_wordlist(self.index, ids, self.min_word_length, self.max_word_length, self.excluded_words)
+        self.init_wordlist_ids(self.index.by_frequency(ids))
+
+    def init_wordlist_ids(self, ids):
+        # Set up the word list from the index ids of its groups, which is all the
+        # workers are given
+        self.word_ids = ids
+        self.letter_map_to_words = self.letter_map_list(ids)
+        self.letter_map_to_words_count = len(self.letter_map_to_words)
+
+    def letter_map_list(self, ids):
+        # Each group's key, its letters packed into an integer, see wordindex, its
+        # words, its index id, and a mask of which letters it has at all
+        return [(self.index.key(i), self.index.packed(i), constraints.allowed_words(self.index.words(i), self.excluded_words),
+                 i, self.index.masks[i]) for i in ids]
+
+    def words_left(self):
+        return constraints.words_left(self.max_words, self.required_words)
+
+    def init_cache(self):
+        self.result_cache = resultcache.ResultCache(self.cache_max_bytes, self.cache_policy)
+        self.cache_scope = self.word_scope()
+
+    def word_scope(self):
+        # The limits that decide which words are in the word list, see constraints
+        return constraints.signature(self.min_word_length, self.max_word_length, self.excluded_words)
+
+    def put_cache(self, key, edges, start):
+        evicted = self.result_cache.put(key, edges, start)
+        if self.stats is not None:
+            self.stats.cache_evictions += evicted
+
+    def check_deadline(self):
+        if self.deadline is not None and time() > self.deadline:
+            raise TimeoutError("Search did not finish in time")
+
+    def word_in_letters(self, word_letter_map, letter_map):
+        for letter in word_letter_map.keys():
+            if letter not in letter_map or word_letter_map[letter] > letter_map[letter]:
+                return False, None
+        letters_left = letter_map.copy()
+        for letter in word_letter_map.keys():
+            letters_left[letter] -= word_letter_map[letter]
+            if letters_left[letter] == 0:
+                del letters_left[letter]
+        return True, letters_left
+
+    def word_to_letter_map(self, word):
+        letter_map = {}
+        for letter in word:
+            letter = letter.lower()
+            if letter in self.allowed_letters:
+                if letter not in letter_map:
+                    letter_map[letter] = 0
+                letter_map[letter] += 1
+        return letter_map
+
+    def letter_map_count(self, letter_map):
+        return sum(letter_map.values())
+
+    def letter_map_to_key(self, letter_map):
+        return ''.join([l * n for l, n in sorted(letter_map.items())])
+
+
+def output(i, n):
+    line = '\r' + "{:6.2f}%".format(i / n * 100)
+    sys.stderr.write(line)
+    sys.stderr.flush()
+
+def read_phrases(filename):
+    # One phrase per line, from a file or - for stdin
+    f = sys.stdin if filename == '-' else open(filename)
+    try:
+        for line in f:
+            line = line.strip()
+            if line != '':
+                yield line
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+def argument(arg):
+    if arg.startswith('--'):
+        if '=' in arg:
+            key = arg[2:arg.index('=')]
+            value = arg[arg.index('=') + 1:]
+            return (key, value)
+        else:
+            return (arg[2:], None)
+    return None
+
+
+def main(a, name, args):
+    # The command line of each engine, and of AnagramFinder, see engines. Options
+    # that set a setting are looked up in a.options(), the rest are handled here
+    options = a.options()
+    words = []
+    stream = False
+    count = False
+    limit = None
+    top = None
+    batch = None
+    for arg in args:
+        arg_found = argument(arg)
+        if arg_found is None:
+            words.append(arg)
+            continue
+        key = arg_found[0]
+        value = arg_found[1]
+        matched = [entry for entry in options if entry[0] == key]
+        if len(matched) > 0:
+            for entry in matched:
+                a.set_option(entry, value)
+        elif key == 'stream':
+            stream = True
+        elif key == 'count':
+            count = True
+        elif key == 'limit':
+            limit = int(value)
+        elif key == 'top':
+            top = int(value)
+        elif key == 'batch':
+            batch = value
+        elif key == 'help':
+            print("Usage: ./{}.py [<OPTIONS>] <WORDS>".format(name))
+            print()
+            print("Options:")
+            lines = [(entry[3], entry[4]) for entry in options if entry[3] is not None] + MODE_OPTIONS
+            lines.append(("--help", "Displays this help"))
+            for usage, description in lines:
+                print("    {:20} {}".format(usage, description))
+            print()
+            sys.exit()
+        else:
+            raise Exception("No such argument: {}".format(key))
+    if a.profile_dir is not None:
+        profiler = cProfile.Profile()
+        profiler.enable()
+    if batch is not None:
+        if count:
+            lines = ({'phrase': phrase, 'count': n} for phrase, n in a.count_many(read_phrases(batch)))
+        elif top is not None:
+            lines = ({'phrase': phrase, 'results': a.find_top(phrase, top)} for phrase in read_phrases(batch))
+        else:
+            lines = ({'phrase': phrase, 'results': results} for phrase, results in a.find_many(read_phrases(batch), limit))
+        for line in lines:
+            if a.stats is not None:
+                line['stats'] = a.stats.as_dict()
+            print(json.dumps(line), flush=True)
+    elif count:
+        print(a.count(''.join(words)))
+    elif top is not None:
+        for result in a.find_top(''.join(words), top):
+            print(result)
+    elif stream:
+        for result in a.find_iter(''.join(words), limit=limit):
+            print(result, flush=True)
+    else:
+        results = a.find(''.join(words), output, limit)
+        sys.stderr.write("\n")
+        sys.stderr.flush()
+        for result in results:
+            print(result)
+    if a.profile_dir is not None:
+        profiler.disable()
+        searchstats.dump_profile(profiler, a.profile_dir, 'main')
+    if a.stats is not None and batch is None:
+        sys.stderr.write(a.stats.report() + "\n")
+    a.close()
@@ -0,0 +1,284 @@
+#!/usr/bin/python3
+
+import sys
+import os
+import csv
+import json
+import time
+import hashlib
+import resource
+import subprocess
+import wordindex
+import engines
+from anagram import AnagramFinder
+from basefinder import argument
+from engines import ENGINES
+
+PHRASES = [
+    'clint eastwood',
+    'tom marvolo riddle',
+    'william shakespeare',
+    'the quick brown fox jumps',
+]
+
+# The suite's phrases, in order of length, so it stays the same from run to run
+SUITE_PHRASES = [
+    'listen',
+    'hello world',
+    'jordan lewis',
+    'clint eastwood',
+    'tom marvolo riddle',
+]
+
+# Each search in the suite is timed this many times, keeping the quickest, and a
+# time is only a regression if it's also this many seconds slower than the baseline,
+# as short searches vary by more than any tolerance from one run to the next
+MEASURE_REPEATS = 5
+MIN_TIME_DIFFERENCE = 0.05
+
+REPORT_FIELDS = ['engine', 'phrase', 'letters', 'procs', 'cache', 'time', 'rss_kb', 'worker_rss_kb', 'count', 'duplicates', 'digest', 'matches']
+
+
+def time_letter_maps(a, letter_map_to_words, letter_map):
+    # The dict based core: test every group against what's left after each group
+    start_time = time.perf_counter()
+    fits = 0
+    for lmw in letter_map_to_words:
+        found, letters_left = a.word_in_letters(lmw[1], letter_map)
+        for lmw2 in letter_map_to_words:
+            found, nl = a.word_in_letters(lmw2[1], letters_left)
+            if found:
+                fits += 1
+    return time.perf_counter() - start_time, fits
+
+
+def time_packed(a, letter_map_to_words, packed):
+    # The packed core: the same tests, as one subtraction and mask check each
+    start_time = time.perf_counter()
+    fits = 0
+    guard = wordindex.PACKED_GUARD
+    for lmw in letter_map_to_words:
+        letters_left = ((packed | guard) - lmw[1]) ^ guard
+        new_guarded = letters_left | guard
+        for lmw2 in letter_map_to_words:
+            if (new_guarded - lmw2[1]) & guard == guard:
+                fits += 1
+    return time.perf_counter() - start_time, fits
+
+
+def core_benchmark(a, phrases):
+    print("{:28} {:>8} {:>10} {:>10} {:>8}".format('phrase', 'groups', 'dict (s)', 'packed (s)', 'speedup'))
+    for phrase in phrases:
+        letter_map = a.word_to_letter_map(phrase)
+        a.init_wordlist(letter_map)
+        packed = wordindex.key_to_packed(a.letter_map_to_key(letter_map))
+        packed_words = a.letter_map_to_words
+        dict_words = [(lmw[0], a.index.letter_map(a.index.find_key(lmw[0])), lmw[2]) for lmw in packed_words]
+
+        dict_time, dict_fits = time_letter_maps(a, dict_words, letter_map)
+        packed_time, packed_fits = time_packed(a, packed_words, packed)
+        if dict_fits != packed_fits:
+            raise Exception("Cores disagree for '{}': {} != {}".format(phrase, dict_fits, packed_fits))
+        print("{:28} {:8d} {:10.3f} {:10.3f} {:7.1f}x".format(phrase, len(packed_words), dict_time, packed_time, dict_time / packed_time))
+
+
+def scaling_benchmark(phrases, max_procs):
+    # Time each engine with 1 to max_procs processes. Each pool is started
+    # before it's timed, as it's kept between searches
+    print("{:10} {:28} {:>6} {:>10} {:>8}".format('engine', 'phrase', 'procs', 'time (s)', 'speedup'))
+    for name, finder_class in ENGINES.items():
+        a = finder_class('dictionary/output.txt')
+        for phrase in phrases:
+            base_time = None
+            for procs in range(1, max_procs + 1):
+                a.proc_count = procs
+                a.find('warm up')
+                start_time = time.perf_counter()
+                a.find(phrase)
+                run_time = time.perf_counter() - start_time
+                if base_time is None:
+                    base_time = run_time
+                print("{:10} {:28} {:6d} {:10.3f} {:7.2f}x".format(name, phrase, procs, run_time, base_time / run_time))
+        a.close()
+
+
+def measure(engine, phrase, procs, caching_enabled, repeats=MEASURE_REPEATS):
+    # Time one search in this process, once the workers are started, taking the
+    # quickest of repeats runs. The peak memory of the workers is only known once
+    # they've been waited for. With the auto engine, the search uses whichever
+    # engine is picked for the phrase
+    a = engines.AnagramFinder('dictionary/output.txt', None if engine == 'auto' else engine)
+    a.proc_count = procs
+    a.caching_enabled = caching_enabled
+    a.find(phrase, limit=1)
+    run_time = None
+    for r in range(0, repeats):
+        start_time = time.perf_counter()
+        results = a.find(phrase)
+        t = time.perf_counter() - start_time
+        if run_time is None or t < run_time:
+            run_time = t
+    for finder in a.finders.values():
+        if finder.pool is not None:
+            finder.pool.executor.shutdown(wait=True)
+    a.close()
+    return {
+        'time': run_time,
+        'rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        'worker_rss_kb': resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+        'count': len(results),
+        'duplicates': len(results) - len(set(results)),
+        'digest': hashlib.sha1('\n'.join(results).encode('utf-8')).hexdigest(),
+    }
+
+
+def run_suite(phrases, engine_names, proc_counts, cache_settings):
+    # Run each search in a new process, so the peak memory is that search's
+    # alone, and check every engine and setting finds the same results
+    rows = []
+    print("{:10} {:28} {:>6} {:>6} {:>10} {:>10} {:>10} {:>9}".format('engine', 'phrase', 'procs', 'cache', 'time (s)', 'rss (KB)', 'workers', 'results'))
+    for phrase in phrases:
+        digests = set()
+        phrase_rows = []
+        for engine in engine_names:
+            for procs in proc_counts:
+                for caching_enabled in cache_settings:
+                    command = [sys.executable, os.path.abspath(__file__), '--measure', '--engine=' + engine,
+                               '--procs=' + str(procs), '--cache=' + ('on' if caching_enabled else 'off'), phrase]
+                    output = subprocess.run(command, check=True, stdout=subprocess.PIPE).stdout
+                    row = dict(json.loads(output), engine=engine, phrase=phrase, procs=procs, cache=caching_enabled)
+                    row['letters'] = len([l for l in phrase.lower() if l in wordindex.ALLOWED_LETTERS])
+                    print("{:10} {:28} {:6d} {:>6} {:10.3f} {:10d} {:10d} {:9d}".format(
+                        engine, phrase, procs, 'on' if caching_enabled else 'off', row['time'], row['rss_kb'], row['worker_rss_kb'], row['count']))
+                    digests.add(row['digest'])
+                    phrase_rows.append(row)
+        for row in phrase_rows:
+            row['matches'] = len(digests) == 1 and row['duplicates'] == 0
+        if len(digests) > 1:
+            print("Results differ for '{}'".format(phrase))
+        if any([row['duplicates'] > 0 for row in phrase_rows]):
+            print("Results repeated for '{}'".format(phrase))
+        rows.extend(phrase_rows)
+    return rows
+
+
+def write_report(rows, filename):
+    if filename.endswith('.csv'):
+        with open(filename, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=REPORT_FIELDS)
+            writer.writeheader()
+            writer.writerows(rows)
+    else:
+        with open(filename, 'w') as f:
+            json.dump(rows, f, indent=1)
+
+
+def read_report(filename):
+    if filename.endswith('.csv'):
+        with open(filename, newline='') as f:
+            rows = list(csv.DictReader(f))
+        for row in rows:
+            row['procs'] = int(row['procs'])
+            row['cache'] = row['cache'] == 'True'
+            for key in ('time',):
+                row[key] = float(row[key])
+            for key in ('rss_kb', 'worker_rss_kb', 'count'):
+                row[key] = int(row[key])
+        return rows
+    with open(filename) as f:
+        return json.load(f)
+
+
+def compare_to_baseline(rows, baseline_rows, tolerance):
+    # Returns a description of each regression against the baseline: a different
+    # number of results, or a time or peak memory more than tolerance worse, and
+    # for the time, at least MIN_TIME_DIFFERENCE worse
+    baseline = dict([((r['engine'], r['phrase'], r['procs'], r['cache']), r) for r in baseline_rows])
+    regressions = []
+    for row in rows:
+        if not row['matches']:
+            regressions.append("{} '{}': results differ between engines or settings, or repeat".format(row['engine'], row['phrase']))
+        base = baseline.get((row['engine'], row['phrase'], row['procs'], row['cache']))
+        if base is None:
+            continue
+        name = "{} '{}' procs={} cache={}".format(row['engine'], row['phrase'], row['procs'], 'on' if row['cache'] else 'off')
+        if row['count'] != base['count'] or row['digest'] != base['digest']:
+            regressions.append("{}: {} results, baseline had {}".format(name, row['count'], base['count']))
+        if row['time'] > base['time'] * (1 + tolerance) and row['time'] - base['time'] > MIN_TIME_DIFFERENCE:
+            regressions.append("{}: took {:.3f}s, baseline {:.3f}s".format(name, row['time'], base['time']))
+        if row['rss_kb'] > base['rss_kb'] * (1 + tolerance):
+            regressions.append("{}: used {}KB, baseline {}KB".format(name, row['rss_kb'], base['rss_kb']))
+    return regressions
+
+
+if __name__ == '__main__':
+    phrases = []
+    max_procs = None
+    suite = False
+    measure_only = False
+    engine_names = list(ENGINES.keys())
+    proc_counts = [1, 2]
+    cache_settings = [True, False]
+    report = None
+    baseline = None
+    tolerance = 0.25
+    for arg in sys.argv[1:]:
+        arg_found = argument(arg)
+        if arg_found is None:
+            phrases.append(arg)
+        else:
+            key = arg_found[0]
+            value = arg_found[1]
+            if key == 'scaling':
+                max_procs = int(value)
+            elif key == 'suite':
+                suite = True
+            elif key == 'measure':
+                measure_only = True
+            elif key == 'engine':
+                engine_names = value.split(',')
+            elif key == 'procs':
+                proc_counts = [int(p) for p in value.split(',')]
+            elif key == 'cache':
+                cache_settings = {'on': [True], 'off': [False], 'both': [True, False]}[value]
+            elif key == 'report':
+                report = value
+            elif key == 'baseline':
+                baseline = value
+            elif key == 'tolerance':
+                tolerance = float(value)
+            elif key == 'help':
+                print("Usage: ./benchmark.py [<OPTIONS>] [<PHRASES>]")
+                print()
+                print("Options:")
+                print("    --scaling=<N>       Times each engine with 1 to N processes, instead of the core")
+                print("    --suite             Times each engine, process count and cache setting, instead of the core")
+                print("    --engine=<NAMES>    Sets the engines for the suite, or auto to pick one for each phrase, default {}".format(','.join(ENGINES)))
+                print("    --procs=<N,...>     Sets the process counts for the suite, default 1,2")
+                print("    --cache=<SETTING>   Runs the suite with the cache on, off or both, default both")
+                print("    --report=<FILE>     Writes the suite's results to a .json or .csv file")
+                print("    --baseline=<FILE>   Compares the suite's results to an earlier report")
+                print("    --tolerance=<N>     Sets how much slower or bigger counts as a regression, default 0.25")
+                print("    --help              Displays this help")
+                print()
+                sys.exit()
+            else:
+                raise Exception("No such argument: {}".format(key))
+    if measure_only:
+        print(json.dumps(measure(engine_names[0], ' '.join(phrases), proc_counts[0], cache_settings[0])))
+    elif suite:
+        rows = run_suite(phrases if len(phrases) > 0 else SUITE_PHRASES, engine_names, proc_counts, cache_settings)
+        if report is not None:
+            write_report(rows, report)
+        if baseline is not None:
+            regressions = compare_to_baseline(rows, read_report(baseline), tolerance)
+            for regression in regressions:
+                print("Regression: " + regression)
+            if len(regressions) > 0:
+                sys.exit(1)
+        elif not all([row['matches'] for row in rows]):
+            sys.exit(1)
+    elif max_procs is not None:
+        scaling_benchmark(phrases if len(phrases) > 0 else PHRASES, max_procs)
+    else:
+        core_benchmark(AnagramFinder('dictionary/output.txt'), phrases if len(phrases) > 0 else PHRASES)
@@ -0,0 +1,104 @@
+#!/usr/bin/python3
+
+import sys
+import json
+import socket
+
+from basefinder import argument
+from server import DEFAULT_HOST, DEFAULT_PORT
+
+
+class AnagramClient():
+
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, path=None):
+        if path is not None:
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.sock.connect(path)
+        else:
+            self.sock = socket.create_connection((host, port))
+        self.file = self.sock.makefile('rwb')
+        self.next_id = 0
+
+    def close(self):
+        self.file.close()
+        self.sock.close()
+
+    def request(self, request):
+        self.next_id += 1
+        request = dict(request, id=self.next_id)
+        self.file.write((json.dumps(request) + '\n').encode('utf-8'))
+        self.file.flush()
+        line = self.file.readline()
+        if not line:
+            raise Exception("Server closed the connection")
+        response = json.loads(line)
+        if 'error' in response:
+            raise Exception(response['error'])
+        return response
+
+    def find(self, letters, limit=None, timeout=None):
+        request = {'op': 'find', 'letters': letters}
+        if limit is not None:
+            request['limit'] = limit
+        if timeout is not None:
+            request['timeout'] = timeout
+        return self.request(request)['results']
+
+    def count(self, letters, timeout=None):
+        request = {'op': 'count', 'letters': letters}
+        if timeout is not None:
+            request['timeout'] = timeout
+        return self.request(request)['count']
+
+
+if __name__ == '__main__':
+    host = DEFAULT_HOST
+    port = DEFAULT_PORT
+    path = None
+    limit = None
+    timeout = None
+    count = False
+    words = []
+    for arg in sys.argv[1:]:
+        arg_found = argument(arg)
+        if arg_found is None:
+            words.append(arg)
+        else:
+            key = arg_found[0]
+            value = arg_found[1]
+            if key == 'host':
+                host = value
+            elif key == 'port':
+                port = int(value)
+            elif key == 'socket':
+                path = value
+            elif key == 'count':
+                count = True
+            elif key == 'limit':
+                limit = int(value)
+            elif key == 'timeout':
+                timeout = float(value)
+            elif key == 'help':
+                print("Usage: ./client.py [<OPTIONS>] <WORDS>")
+                print()
+                print("Options:")
+                print("    --host=<HOST>   Connects to this address, default {}".format(DEFAULT_HOST))
+                print("    --port=<N>      Connects to this TCP port, default {}".format(DEFAULT_PORT))
+                print("    --socket=<PATH> Connects to this Unix socket instead of TCP")
+                print("    --count         Prints the number of results instead of the results")
+                print("    --limit=<N>     Returns at most N results")
+                print("    --timeout=<N>   Gives up on the search after N seconds")
+                print("    --help          Displays this help")
+                print()
+                sys.exit()
+            else:
+                raise Exception("No such argument: {}".format(key))
+    c = AnagramClient(host, port, path)
+    try:
+        if count:
+            print(c.count(''.join(words), timeout))
+        else:
+            for result in c.find(''.join(words), limit, timeout):
+                print(result)
+    finally:
+        c.close()
@@ -0,0 +1,66 @@
+import wordindex
+
+
+# Limits on the results of a search, set on a finder and shared by both engines.
+# The word length limits and excluded words are applied to the word list, and
+# the required words are taken out of the letters before searching and put back
+# into each result. The limit on the number of words is kept track of by the
+# engines as they search, so branches needing too many words are never searched.
+
+
+def filter_wordlist(index, ids, min_length=None, max_length=None, excluded_words=()):
+    # The groups with words of an allowed length, that aren't all excluded
+    if min_length is None and max_length is None and len(excluded_words) == 0:
+        return ids
+    found = []
+    for i in ids:
+        length = index.key_offsets[i + 1] - index.key_offsets[i]
+        if min_length is not None and length < min_length:
+            continue
+        if max_length is not None and length > max_length:
+            continue
+        if len(allowed_words(index.words(i), excluded_words)) == 0:
+            continue
+        found.append(i)
+    return found
+
+
+def signature(min_length=None, max_length=None, excluded_words=()):
+    # The limits that decide which words are in the word list, as a string
+    return '{},{},{}'.format('' if min_length is None else min_length, '' if max_length is None else max_length,
+                             ' '.join(sorted(excluded_words)))
+
+
+def allowed_words(words, excluded_words):
+    if len(excluded_words) == 0:
+        return words
+    return [word for word in words if word.lower() not in excluded_words]
+
+
+def remove_required(packed, required_words):
+    # The letters left once the required words are taken out
+    for word in required_words:
+        packed = wordindex.packed_subtract(packed, wordindex.key_to_packed(wordindex.word_to_key(word)))
+        if packed is None:
+            raise Exception("Not enough letters for required word: {}".format(word))
+    return packed
+
+
+def add_required(result, required_words):
+    if len(required_words) == 0:
+        return result
+    return ' '.join(sorted(result.split(' ') + required_words))
+
+
+def required_only(required_words, max_words=None):
+    # The results when the required words use up all the letters
+    if len(required_words) == 0 or (max_words is not None and len(required_words) > max_words):
+        return []
+    return [' '.join(sorted(required_words))]
+
+
+def words_left(max_words, required_words):
+    # How many words the search can use, or None for any number
+    if max_words is None:
+        return None
+    return max_words - len(required_words)
@@ -0,0 +1,129 @@
+#!/usr/bin/python3
+
+import sys
+import os
+import re
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import wordindex
+from basefinder import argument
+
+
+# Builds output.txt from ORIGINAL.txt, adding the words in additional.txt and
+# taking out the words in suppress.txt, then builds its index, see wordindex.
+# Each word can be followed by how often it's used, so searches can try the most
+# used words first. If the index is up to date with the last output.txt, only the
+# words that changed are put into it, rather than building it all again.
+
+DICTIONARY_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# A single word, optionally followed by how often it's used
+WORD_LINE = re.compile(r'^(\S+)(?:\s+(\d+))?\s*$')
+
+# Most words that can change before the index is built again rather than patched
+MAX_PATCH_FRACTION = 0.1
+
+
+def read_list(filename):
+    # Mapping of each word in a list to how often it's used. Lines with more than
+    # one word, or that aren't UTF-8, are left out
+    words = {}
+    f = open(filename, 'rb')
+    try:
+        for line in f:
+            try:
+                line = line.decode('utf-8')
+            except UnicodeDecodeError:
+                continue
+            match = WORD_LINE.match(line)
+            if match is None:
+                continue
+            frequency = int(match.group(2) or 0)
+            words[match.group(1)] = max(frequency, words.get(match.group(1), 0))
+    finally:
+        f.close()
+    return words
+
+
+def make_words(directory):
+    words = read_list(os.path.join(directory, 'ORIGINAL.txt'))
+    for word, frequency in read_list(os.path.join(directory, 'additional.txt')).items():
+        words[word] = max(frequency, words.get(word, 0))
+    for word in read_list(os.path.join(directory, 'suppress.txt')):
+        words.pop(word, None)
+    return words
+
+
+def write_output(filename, words):
+    tmp_file = '{}.{}.tmp'.format(filename, os.getpid())
+    f = open(tmp_file, 'w')
+    for word in sorted(words):
+        if words[word] > 0:
+            f.write("{}\t{}\n".format(word, words[word]))
+        else:
+            f.write(word + '\n')
+    f.close()
+    os.replace(tmp_file, filename)
+
+
+def changed_groups(index, words, changed):
+    # The words now in each group with a changed word, by key
+    changes = {}
+    for key, group in wordindex.group_words([(word, 0) for word in changed]).items():
+        i = index.find_key(key)
+        group = set([word for word, frequency in group])
+        if i is not None:
+            group.update(index.words(i))
+        changes[key] = [(word, words[word]) for word in group if word in words]
+    return changes
+
+
+def make(directory=DICTIONARY_DIR, full=False):
+    output_file = os.path.join(directory, 'output.txt')
+    words = make_words(directory)
+
+    # See what's changed since the index was last built
+    previous = None
+    previous_words = None
+    if not full:
+        previous = wordindex.open_index(output_file)
+        if previous is not None:
+            previous_words = dict(wordindex.read_words(output_file))
+    if previous_words == words:
+        print("{} is up to date ({} words)".format(output_file, len(words)))
+        return
+
+    write_output(output_file, words)
+    if previous is not None:
+        changed = set([word for word, frequency in set(words.items()) ^ set(previous_words.items())])
+        if len(changed) <= len(words) * MAX_PATCH_FRACTION:
+            wordindex.patch_index(previous, output_file, changed_groups(previous, words, changed))
+            print("Wrote {} and patched its index ({} words, {} changed)".format(output_file, len(words), len(changed)))
+            return
+    wordindex.build_index(output_file)
+    print("Wrote {} and its index ({} words)".format(output_file, len(words)))
+
+
+if __name__ == '__main__':
+    full = False
+    for arg in sys.argv[1:]:
+        arg_found = argument(arg)
+        if arg_found is None:
+            raise Exception("Unexpected argument: {}".format(arg))
+        key = arg_found[0]
+        if key == 'full':
+            full = True
+        elif key == 'help':
+            print("Usage: ./make.py [<OPTIONS>]")
+            print()
+            print("Builds output.txt and its index from ORIGINAL.txt, additional.txt and suppress.txt.")
+            print("Any word can be followed by how often it's used, so searches try the most used words first.")
+            print()
+            print("Options:")
+            print("    --full               Builds the index again, even if only a few words changed")
+            print("    --help               Displays this help")
+            print()
+            sys.exit()
+        else:
+            raise Exception("No such argument: {}".format(key))
+    make(full=full)
@@ -0,0 +1,130 @@
+import os
+import sqlite3
+import hashlib
+from time import time
+from contextlib import contextmanager
+
+
+# Results for sets of letters, kept on disk from one run to the next in an SQLite
+# database next to the dictionary, see anagram2. Each entry is one node of the graph
+# of results, see resultdag, and the earliest key it's complete from. Only the key of
+# each group and how many times it's used are kept, as what follows is found again by
+# looking up the letters left, in memory, then here, then by searching for them.
+#
+# Entries are only good for the dictionary they were made from, so the database
+# keeps the dictionary's hash and is emptied if it changes. The limits on the words
+# used are part of each entry's key. Once the entries take up more than max_bytes,
+# the least recently used are taken out, or with the lfu policy, the least used.
+
+MEMO_VERSION = 1
+
+
+def memo_filename(filename):
+    return os.path.splitext(filename)[0] + '.memo.sqlite'
+
+
+def dictionary_hash(filename):
+    f = open(filename, 'rb')
+    try:
+        return hashlib.sha1(f.read()).hexdigest()
+    finally:
+        f.close()
+
+
+class DiskMemo():
+
+    def __init__(self, filename, memo_file=None, max_bytes=100000000, policy='lru'):
+        if policy not in ('lru', 'lfu'):
+            raise Exception("No such memo policy: {}".format(policy))
+        if memo_file is None:
+            memo_file = memo_filename(filename)
+        self.max_bytes = max_bytes
+        self.policy = policy
+        # Fraction of max_bytes freed up once it's gone over, so it isn't gone over again straight away
+        self.clear_fraction = 0.1
+
+        # Transactions are begun by write, not by sqlite3, see there
+        self.db = sqlite3.connect(memo_file, timeout=30, isolation_level=None)
+        # It's only a cache, so it isn't synced to disk on every write, and with
+        # a write-ahead log, workers can read it while another one is writing
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('PRAGMA synchronous=NORMAL')
+        stamp = '{}:{}'.format(MEMO_VERSION, dictionary_hash(filename))
+        with self.write():
+            self.db.execute('CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value)')
+            self.db.execute('CREATE TABLE IF NOT EXISTS memo (key TEXT PRIMARY KEY, start TEXT, edges TEXT, used REAL, uses INTEGER)')
+            row = self.db.execute("SELECT value FROM meta WHERE name = 'stamp'").fetchone()
+            if row is None or row[0] != stamp:
+                self.db.execute('DELETE FROM memo')
+                self.db.execute("INSERT OR REPLACE INTO meta VALUES ('stamp', ?)", (stamp,))
+                self.db.execute("INSERT OR REPLACE INTO meta VALUES ('bytes', 0)")
+
+        # Entries made, and how many times each entry was used, since the last flush
+        self.pending = {}
+        self.uses = {}
+
+    @contextmanager
+    def write(self):
+        # A transaction that takes the write lock from the start, waiting for other
+        # processes' writes to finish. One that only took it on its first write would
+        # fail straight away if another process had written since it began reading
+        self.db.execute('BEGIN IMMEDIATE')
+        try:
+            yield
+        except BaseException:
+            self.db.execute('ROLLBACK')
+            raise
+        self.db.execute('COMMIT')
+
+    def get(self, key):
+        # Returns (start, edges) for the key, or None
+        row = self.db.execute('SELECT start, edges FROM memo WHERE key = ?', (key,)).fetchone()
+        if row is not None:
+            self.uses[key] = self.uses.get(key, 0) + 1
+        return row
+
+    def put(self, key, start, edges):
+        if key not in self.pending or self.pending[key][0] > start:
+            self.pending[key] = (start, edges)
+
+    def flush(self):
+        # Write what's been made and used to the database, all at once
+        if len(self.pending) == 0 and len(self.uses) == 0:
+            return
+        now = time()
+        with self.write():
+            self.db.executemany('UPDATE memo SET used = ?, uses = uses + ? WHERE key = ?',
+                                [(now, n, key) for key, n in self.uses.items()])
+            added = 0
+            for key, (start, edges) in self.pending.items():
+                row = self.db.execute('SELECT start, LENGTH(edges) FROM memo WHERE key = ?', (key,)).fetchone()
+                if row is not None:
+                    # Keep whichever is complete from the earlier key
+                    if row[0] <= start:
+                        continue
+                    added -= row[1]
+                self.db.execute('INSERT OR REPLACE INTO memo VALUES (?, ?, ?, ?, 0)', (key, start, edges, now))
+                added += len(edges)
+            self.db.execute("UPDATE meta SET value = value + ? WHERE name = 'bytes'", (added,))
+            self.evict()
+        self.pending = {}
+        self.uses = {}
+
+    def evict(self):
+        size = self.db.execute("SELECT value FROM meta WHERE name = 'bytes'").fetchone()[0]
+        if size <= self.max_bytes:
+            return
+        target = self.max_bytes * (1 - self.clear_fraction)
+        order = 'used' if self.policy == 'lru' else 'uses, used'
+        removed = []
+        for key, length in self.db.execute('SELECT key, LENGTH(edges) FROM memo ORDER BY ' + order):
+            removed.append((key,))
+            size -= length
+            if size <= target:
+                break
+        self.db.executemany('DELETE FROM memo WHERE key = ?', removed)
+        self.db.execute("UPDATE meta SET value = ? WHERE name = 'bytes'", (max(size, 0),))
+
+    def close(self):
+        self.flush()
+        self.db.close()
@@ -0,0 +1,148 @@
+#!/usr/bin/python3
+
+import sys
+import wordindex
+import basefinder
+import anagram
+import anagram2
+from basefinder import option
+
+
+# The engines, and one finder for all of them, which searches each phrase with the
+# engine that should be quickest for it, or the one it's told to use. Each engine
+# is a subclass of basefinder.BaseFinder, and more can be added with register_engine,
+# along with which phrases they should be picked for.
+#
+# Which engine is quickest depends on the letters. The word list engine, anagram,
+# looks words up by the mask of letters they contain, or goes through every
+# combination of the letters, which beats walking the word tree of anagram2 while
+# there are only a few different letters, and so few masks. With more different
+# letters, or more letters, the word tree is quicker, by up to about 1.6x on
+# phrases of 11 to 16 letters. See ./benchmark.py --suite --engine=anagram,anagram2,auto
+
+
+# Engines by name
+ENGINES = {}
+
+# Rules picking an engine for a phrase, tried in turn, most recently registered
+# first: (name, suits), see register_engine
+SELECTORS = []
+
+# The engine for phrases no rule picks
+DEFAULT_ENGINE = 'anagram2'
+
+# Most different letters, and most letters, for which the word list engine is picked
+WORDLIST_MAX_DISTINCT = 6
+WORDLIST_MAX_LETTERS = 20
+
+
+def register_engine(name, finder_class, suits=None):
+    # Add an engine. If suits is given, it's called with the number of letters in a
+    # phrase and how many of them are different, and the engine is picked for the
+    # phrases it returns True for, ahead of the engines registered before it
+    ENGINES[name] = finder_class
+    if suits is not None:
+        SELECTORS.insert(0, (name, suits))
+
+
+def choose_engine(letters):
+    # The name of the engine that should be quickest for these letters
+    key = wordindex.word_to_key(letters)
+    letter_count = len(key)
+    distinct = len(set(key))
+    for name, suits in SELECTORS:
+        if suits(letter_count, distinct):
+            return name
+    return DEFAULT_ENGINE
+
+
+def wordlist_suits(letter_count, distinct):
+    return distinct <= WORDLIST_MAX_DISTINCT and letter_count <= WORDLIST_MAX_LETTERS
+
+
+register_engine('anagram', anagram.AnagramFinder, wordlist_suits)
+register_engine('anagram2', anagram2.AnagramFinder)
+
+
+class AnagramFinder(basefinder.BaseFinder):
+
+    def __init__(self, filename, engine=None):
+        super().__init__(filename)
+
+        # The engine to search with, or None to pick one for each phrase, see choose_engine
+        if engine is not None and engine not in ENGINES:
+            raise Exception("No such engine: {}".format(engine))
+        self.engine = engine
+        # Settings only some engines have, such as memo_enabled, set on each engine that has them
+        self.engine_settings = {}
+
+        # Each engine's finder, made the first time it's picked, all sharing the
+        # dictionary index. The settings every engine has are handed on to it
+        # before each search, see basefinder.SETTINGS
+        self.finders = {}
+        self.finder = None
+
+    def options(self):
+        # The options every engine has, then which engine to use, then each engine's own
+        options = basefinder.OPTIONS + [
+            option('engine', 'engine', lambda value: None if value == 'auto' else value,
+                   "--engine=<NAME>", "Searches with {} or auto, which picks one for each phrase".format(', '.join(ENGINES))),
+        ]
+        for finder_class in ENGINES.values():
+            options += [entry for entry in finder_class.ENGINE_OPTIONS if entry not in options]
+        return options
+
+    def set_option(self, entry, value):
+        name, setting, convert, usage, description = entry
+        value = convert(value) if callable(convert) else convert
+        if hasattr(self, setting):
+            setattr(self, setting, value)
+        else:
+            self.engine_settings[setting] = value
+
+    def get_finder(self, letters):
+        name = self.engine if self.engine is not None else choose_engine(letters)
+        if name not in ENGINES:
+            raise Exception("No such engine: {}".format(name))
+        if name not in self.finders:
+            self.finders[name] = ENGINES[name](self.filename, self.index)
+        finder = self.finders[name]
+        for key in basefinder.SETTINGS:
+            setattr(finder, key, getattr(self, key))
+        for key, value in self.engine_settings.items():
+            if hasattr(finder, key):
+                setattr(finder, key, value)
+        self.finder = finder
+        return finder
+
+    def find_iter(self, letters, display=None, limit=None):
+        finder = self.get_finder(letters)
+        try:
+            yield from finder.find_iter(letters, display, limit)
+        finally:
+            self.stats = finder.stats
+
+    def count(self, letters):
+        finder = self.get_finder(letters)
+        try:
+            return finder.count(letters)
+        finally:
+            self.stats = finder.stats
+
+    def find_top(self, letters, k, score=None):
+        finder = self.get_finder(letters)
+        if finder.word_frequencies is None:
+            finder.word_frequencies = self.word_frequencies
+        try:
+            return finder.find_top(letters, k, score)
+        finally:
+            self.stats = finder.stats
+            self.word_frequencies = finder.word_frequencies
+
+    def close(self):
+        for finder in self.finders.values():
+            finder.close()
+
+
+if __name__ == '__main__':
+    basefinder.main(AnagramFinder('dictionary/output.txt'), 'engines', sys.argv[1:])
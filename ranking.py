@@ -0,0 +1,121 @@
+import math
+from heapq import heappush, heapreplace
+import wordindex
+
+
+# Ranks results, so the best few can be found without putting together the rest,
+# see top below. A result's score is the sum of the scores of its words, and
+# a word's score is worked out from the word and how often it's used, which is 0
+# if the dictionary doesn't say. The default prefers fewer words, then longer
+# words, then more used ones. Each word costs WORD_PENALTY, which is more than
+# the squares of the lengths of the words of any phrase of up to 1000 letters add
+# up to, so a result with fewer words always comes first. Of results with as many
+# words, the squares of the lengths add up to more the longer the longest words
+# are, and as they always add up to an odd number for an odd number of letters and
+# an even one for an even number, they differ by at least 2, which is more than
+# the frequencies add to a result of up to 9 words, each used less than a billion
+# times. The score stays a sum over the words, so the bounds in top still hold.
+
+# What each word in a result costs
+WORD_PENALTY = 1000000
+
+# How much how often a word is used counts for, against the square of its length
+FREQUENCY_WEIGHT = 0.01
+
+
+def default_score(word, frequency):
+    return len(wordindex.word_to_key(word)) ** 2 - WORD_PENALTY + math.log1p(frequency) * FREQUENCY_WEIGHT
+
+
+def load_frequencies(index, filename):
+    # How often each word in the dictionary is used, or nothing if it doesn't say
+    if index.max_frequency == 0:
+        return {}
+    return dict(wordindex.read_words(filename))
+
+
+def word_scorer(score, frequencies):
+    # Score of each word, worked out once
+    if score is None:
+        score = default_score
+    scores = {}
+
+    def word_score(word):
+        if word not in scores:
+            scores[word] = score(word, frequencies.get(word, 0))
+        return scores[word]
+
+    return word_score
+
+
+def top(word_list, packed, k, word_score, words_left=None):
+    # The k results with the highest scores, best first, as (score, list of words),
+    # from a word list of (key, packed, words, ...) for each group of anagrams, see
+    # the engines. The groups are tried longest first, each followed only by itself
+    # and later groups, and a branch is given up on as soon as even the best words
+    # of each length couldn't make up the rest of the letters into a better result
+    # than the kth best found so far, so most of the results are never looked at
+    groups = []
+    for lmw in sorted(word_list, key=lambda lmw: -len(lmw[0])):
+        words = sorted([(word_score(word), word) for word in lmw[2]], key=lambda sw: -sw[0])
+        if len(words) > 0:
+            groups.append((len(lmw[0]), lmw[1], wordindex.packed_to_mask(lmw[1]), words))
+    letter_count = sum(packed.to_bytes(wordindex.LETTER_COUNT, 'little'))
+    bounds = length_bounds(groups, letter_count)
+
+    best = []
+    pushed = [0]
+
+    def search(first, first_word, packed, letters, score, picked, words_left):
+        if packed == 0:
+            # Ties are broken by the order results are found in
+            pushed[0] += 1
+            if len(best) < k:
+                heappush(best, (score, -pushed[0], picked))
+            else:
+                heapreplace(best, (score, -pushed[0], picked))
+            return
+        if words_left is not None and words_left <= 0:
+            return
+        missing = ~wordindex.packed_to_mask(packed)
+        guard = wordindex.PACKED_GUARD
+        guarded = packed | guard
+        for g in range(first, len(groups)):
+            length, word_packed, mask, words = groups[g]
+            if length > letters:
+                continue
+            # Later groups are no longer, so can do no better than this one
+            if len(best) == k and score + bounds[letters][length] <= best[0][0]:
+                return
+            if mask & missing or (guarded - word_packed) & guard != guard:
+                continue
+            letters_left = letters - length
+            for w in range(first_word if g == first else 0, len(words)):
+                word_score, word = words[w]
+                if len(best) == k and score + word_score + bounds[letters_left][length] <= best[0][0]:
+                    break
+                search(g, w, packed - word_packed, letters_left, score + word_score, picked + [word],
+                       None if words_left is None else words_left - 1)
+
+    if k > 0:
+        search(0, 0, packed, letter_count, 0, [], words_left)
+    return [(score, picked) for score, order, picked in sorted(best, reverse=True)]
+
+
+def length_bounds(groups, letter_count):
+    # The best score any words of at most each length could make from each number
+    # of letters, from the best word of each length, or -inf if they can't add up
+    best_of_length = {}
+    for length, word_packed, mask, words in groups:
+        if length not in best_of_length or words[0][0] > best_of_length[length]:
+            best_of_length[length] = words[0][0]
+    max_length = max(best_of_length.keys(), default=0)
+    bounds = []
+    for letters in range(0, letter_count + 1):
+        row = [0 if letters == 0 else -math.inf]
+        for length in range(1, max_length + 1):
+            row.append(row[-1])
+            if length in best_of_length and length <= letters:
+                row[-1] = max(row[-1], best_of_length[length] + bounds[letters - length][length])
+        bounds.append(row)
+    return bounds
@@ -0,0 +1,169 @@
+from collections import OrderedDict
+
+
+# The cache of results for each set of letters, shared by both engines. An entry is
+# [edges, start], the edges of a node of the graph of results, see resultdag, and
+# the earliest place in the word list they're complete from, which is a position or
+# a key depending on the engine. Some entries have a handful of edges and others
+# thousands, so the cache is limited by roughly how much memory they take up rather
+# than by how many there are. Once it's over the limit, entries are taken out as
+# others are added, picked by the policy, each of which takes the same time however
+# many entries there are:
+#   lru   the least recently used
+#   lfu   the least used, and the least recently used of those
+#   size  the least recently used of the biggest entries, so as few go as possible
+
+# Rough bytes taken up by an entry, and by each of its edges
+ENTRY_BYTES = 200
+EDGE_BYTES = 260
+
+
+def entry_bytes(edges):
+    return ENTRY_BYTES + EDGE_BYTES * len(edges)
+
+
+class ResultCache():
+
+    def __init__(self, max_bytes=500000000, policy='lru'):
+        if policy not in POLICIES:
+            raise Exception("No such cache policy: {}".format(policy))
+        self.max_bytes = max_bytes
+        self.policy = POLICIES[policy]()
+        self.touch = self.policy.touch
+        self.entries = {}
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key):
+        # Returns the entry for the key, or None
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.touch(key)
+        return entry
+
+    def put(self, key, edges, start):
+        # Add or replace the entry for the key, returning how many entries were taken out to make room
+        if key in self.entries:
+            self.remove(key)
+        size = entry_bytes(edges)
+
+        # Room is made before the entry goes in, so it's never picked itself, which
+        # under lfu a new entry always would be. One too big for the cache isn't kept
+        evicted = 0
+        while self.bytes + size > self.max_bytes and len(self.entries) > 0:
+            self.remove(self.policy.victim())
+            evicted += 1
+        self.evictions += evicted
+        if size <= self.max_bytes:
+            self.entries[key] = [edges, start]
+            self.bytes += size
+            self.policy.add(key, size)
+        return evicted
+
+    def remove(self, key):
+        edges, start = self.entries.pop(key)
+        self.bytes -= entry_bytes(edges)
+        self.policy.remove(key)
+
+    def clear(self):
+        self.entries = {}
+        self.bytes = 0
+        self.policy = type(self.policy)()
+        self.touch = self.policy.touch
+
+
+class LRUPolicy():
+
+    def __init__(self):
+        # Keys, least recently used first
+        self.order = OrderedDict()
+        # Looked up on every hit, so straight to the OrderedDict
+        self.touch = self.order.move_to_end
+
+    def add(self, key, size):
+        self.order[key] = None
+
+    def remove(self, key):
+        del self.order[key]
+
+    def victim(self):
+        return next(iter(self.order))
+
+
+class LFUPolicy():
+
+    def __init__(self):
+        # Times each key has been used, and the keys used each number of times,
+        # least recently used first
+        self.counts = {}
+        self.buckets = {}
+        self.min_count = 0
+
+    def add(self, key, size):
+        self.counts[key] = 1
+        self.buckets.setdefault(1, OrderedDict())[key] = None
+        self.min_count = 1
+
+    def touch(self, key):
+        n = self.counts[key]
+        self.take(key, n)
+        self.counts[key] = n + 1
+        self.buckets.setdefault(n + 1, OrderedDict())[key] = None
+        if self.min_count == n and n not in self.buckets:
+            self.min_count = n + 1
+
+    def remove(self, key):
+        self.take(key, self.counts.pop(key))
+
+    def take(self, key, n):
+        bucket = self.buckets[n]
+        del bucket[key]
+        if len(bucket) == 0:
+            del self.buckets[n]
+
+    def victim(self):
+        # Only a removal can leave the least count without any keys
+        if self.min_count not in self.buckets:
+            self.min_count = min(self.buckets)
+        return next(iter(self.buckets[self.min_count]))
+
+
+class SizePolicy():
+
+    def __init__(self):
+        # Keys by the power of 2 of their size, least recently used first
+        self.classes = {}
+        self.key_class = {}
+
+    def add(self, key, size):
+        size_class = size.bit_length()
+        self.key_class[key] = size_class
+        self.classes.setdefault(size_class, OrderedDict())[key] = None
+
+    def touch(self, key):
+        self.classes[self.key_class[key]].move_to_end(key)
+
+    def remove(self, key):
+        size_class = self.key_class.pop(key)
+        del self.classes[size_class][key]
+        if len(self.classes[size_class]) == 0:
+            del self.classes[size_class]
+
+    def victim(self):
+        # There are only as many classes as bits in the biggest size
+        return next(iter(self.classes[max(self.classes)]))
+
+
+POLICIES = {
+    'lru': LRUPolicy,
+    'lfu': LFUPolicy,
+    'size': SizePolicy,
+}
@@ -0,0 +1,62 @@
+from bisect import bisect_left
+from itertools import combinations_with_replacement
+from math import comb
+
+
+# Results are memoised as a graph rather than as lists of strings. A node is a list
+# of edges (order, times, words, child), sorted by order, where each edge means
+# "times words from the anagram group words, followed by any result of child".
+# The child is a reference (node, start) to the edges of a node from order start
+# onwards, or None when there are no letters left. Since each group of anagrams is
+# only followed by later groups, and used more than once by an edge's times rather
+# than by following itself, each result is only reachable one way, and the
+# memory used grows with the number of distinct states rather than with results.
+
+
+def ref(node, start):
+    # Reference to a node's edges from start onwards, or None if there are none
+    if bisect_left(node, (start,)) < len(node):
+        return (node, start)
+    return None
+
+
+def edges(node_ref):
+    node, start = node_ref
+    return node[bisect_left(node, (start,)):]
+
+
+def expand(node_ref):
+    # Yield each result as a tuple of words
+    for order, times, words, child in edges(node_ref):
+        for picked in combinations_with_replacement(words, times):
+            if child is None:
+                yield picked
+            else:
+                for rest in expand(child):
+                    yield picked + rest
+
+
+def results(node_ref):
+    # Yield each result as it's output, its words in alphabetical order. No result
+    # is reached twice, so there's nothing to take out afterwards
+    for picked in expand(node_ref):
+        yield ' '.join(sorted(picked))
+
+
+def count(node_ref, counts):
+    # Number of results, without expanding them
+    key = (id(node_ref[0]), node_ref[1])
+    if key in counts:
+        return counts[key]
+    total = 0
+    for order, times, words, child in edges(node_ref):
+        ways = comb(len(words) + times - 1, times)
+        if child is not None:
+            ways *= count(child, counts)
+        total += ways
+    counts[key] = total
+    return total
+
+
+def sort_edges(node):
+    node.sort(key=lambda edge: edge[0])
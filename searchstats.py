@@ -0,0 +1,83 @@
+import os
+
+
+# Counts of what a search did, kept by a finder while stats_enabled is set.
+# Workers keep their own for each task, which are added to the search's stats.
+
+
+class SearchStats():
+
+    def __init__(self):
+        # Groups of anagrams in the word list for the search
+        self.candidates = 0
+        # Times a group was tested against the remaining letters
+        self.word_tests = 0
+        # Searches of the word list, by how many words had been used before them
+        self.depth = 0
+        self.depths = {}
+        # Searches through every combination of letters, or through the words, or with NumPy, or by mask
+        self.fast_path = 0
+        self.slow_path = 0
+        self.numpy_path = 0
+        self.bucket_path = 0
+        # Searches answered by the cache, in full or in part, or not at all
+        self.cache_hits = 0
+        self.cache_partial_hits = 0
+        self.cache_misses = 0
+        self.cache_evictions = 0
+        # Searches answered from the memo on disk, or not
+        self.memo_hits = 0
+        self.memo_misses = 0
+        # Results sent back by workers, and their size compressed, see workpool
+        self.tasks = 0
+        self.results_sent = 0
+        self.bytes_sent = 0
+        # Seconds each worker spent on tasks, and waiting between them, by pid
+        self.workers = {}
+        self.elapsed = 0
+
+    def descend(self):
+        self.depth += 1
+        self.depths[self.depth] = self.depths.get(self.depth, 0) + 1
+
+    def ascend(self):
+        self.depth -= 1
+
+    def merge(self, other):
+        for key in ('word_tests', 'fast_path', 'slow_path', 'numpy_path', 'bucket_path', 'cache_hits',
+                    'cache_partial_hits', 'cache_misses', 'cache_evictions', 'memo_hits', 'memo_misses', 'tasks', 'results_sent', 'bytes_sent'):
+            setattr(self, key, getattr(self, key) + getattr(other, key))
+        for depth, n in other.depths.items():
+            self.depths[depth] = self.depths.get(depth, 0) + n
+        for pid, (busy, idle) in other.workers.items():
+            total = self.workers.get(pid, (0, 0))
+            self.workers[pid] = (total[0] + busy, total[1] + idle)
+
+    def as_dict(self):
+        d = dict([(k, v) for k, v in vars(self).items() if k != 'depth'])
+        d['depths'] = dict(sorted(self.depths.items()))
+        d['workers'] = dict([(str(pid), {'busy': busy, 'idle': idle}) for pid, (busy, idle) in self.workers.items()])
+        return d
+
+    def report(self):
+        lines = []
+        lines.append("Time:            {:.3f}s".format(self.elapsed))
+        lines.append("Candidates:      {}".format(self.candidates))
+        lines.append("Word tests:      {}".format(self.word_tests))
+        lines.append("Depths:          {}".format(', '.join(["{}: {}".format(d, n) for d, n in sorted(self.depths.items())])))
+        lines.append("Paths:           {} fast, {} slow, {} NumPy, {} mask".format(
+            self.fast_path, self.slow_path, self.numpy_path, self.bucket_path))
+        lines.append("Cache:           {} hits, {} partial, {} misses, {} evicted".format(
+            self.cache_hits, self.cache_partial_hits, self.cache_misses, self.cache_evictions))
+        if self.memo_hits + self.memo_misses > 0:
+            lines.append("Memo:            {} hits, {} misses".format(self.memo_hits, self.memo_misses))
+        if self.tasks > 0:
+            lines.append("Tasks:           {}, sending {} results in {} bytes".format(self.tasks, self.results_sent, self.bytes_sent))
+        for pid, (busy, idle) in sorted(self.workers.items()):
+            lines.append("Worker {:<8} {:.3f}s busy, {:.3f}s idle".format(str(pid) + ':', busy, idle))
+        return '\n'.join(lines)
+
+
+def dump_profile(profiler, profile_dir, name):
+    os.makedirs(profile_dir, exist_ok=True)
+    profiler.dump_stats(os.path.join(profile_dir, name + '.prof'))
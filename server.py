@@ -0,0 +1,220 @@
+#!/usr/bin/python3
+
+import sys
+import os
+import json
+import signal
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from time import time
+
+import engines
+from basefinder import argument
+
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 7250
+
+
+# Each worker process keeps its own finder, so the dictionary is only loaded once per worker
+finder = None
+
+
+def init_worker(engine, filename, caching_enabled):
+    global finder
+    finder = engines.AnagramFinder(filename, None if engine == 'auto' else engine)
+    finder.caching_enabled = caching_enabled
+
+
+def worker_find(letters, limit, deadline):
+    # Look for one more result than the limit, to tell if there are more
+    finder.deadline = deadline
+    try:
+        results = finder.find(letters, limit=None if limit is None else limit + 1)
+    finally:
+        finder.deadline = None
+    if limit is not None and len(results) > limit:
+        return results[:limit], True
+    return results, False
+
+
+def worker_count(letters, deadline):
+    finder.deadline = deadline
+    try:
+        return finder.count(letters)
+    finally:
+        finder.deadline = None
+
+
+class AnagramServer():
+
+    def __init__(self, filename, engine='auto', proc_count=1):
+        # The engine every search uses, or auto to pick one for each, see engines
+        if engine != 'auto' and engine not in engines.ENGINES:
+            raise Exception("No such engine: {}".format(engine))
+        self.filename = filename
+        self.engine = engine
+        self.proc_count = proc_count
+
+        self.caching_enabled = True
+        self.timeout = 60
+        self.max_results = 100000
+
+        self.pool = None
+        self.server = None
+
+    async def start(self, host=DEFAULT_HOST, port=DEFAULT_PORT, path=None):
+        # Start the workers and have each one load the dictionary before taking requests
+        self.pool = ProcessPoolExecutor(
+            max_workers=self.proc_count,
+            initializer=init_worker,
+            initargs=(self.engine, self.filename, self.caching_enabled))
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*[loop.run_in_executor(self.pool, worker_find, '', None, None) for t in range(0, self.proc_count)])
+
+        if path is not None:
+            self.server = await asyncio.start_unix_server(self.handle_connection, path=path)
+        else:
+            self.server = await asyncio.start_server(self.handle_connection, host=host, port=port)
+        return self.server
+
+    async def stop(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+            self.server = None
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+            self.pool = None
+
+    async def handle_connection(self, reader, writer):
+        # Each line is a request, which are answered as they finish, so
+        # responses may come back in a different order to the requests
+        tasks = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                task = asyncio.create_task(self.handle_line(line, writer))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if len(tasks) > 0:
+                await asyncio.wait(tasks)
+        finally:
+            writer.close()
+
+    async def handle_line(self, line, writer):
+        request_id = None
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("Request must be a JSON object")
+            request_id = request.get('id')
+            response = await self.handle_request(request)
+        except Exception as e:
+            response = {'error': str(e) or type(e).__name__}
+        response['id'] = request_id
+        writer.write((json.dumps(response) + '\n').encode('utf-8'))
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+
+    async def handle_request(self, request):
+        op = request.get('op', 'find')
+        if op == 'ping':
+            return {'engine': self.engine}
+        if op not in ('find', 'count'):
+            raise ValueError("No such operation: {}".format(op))
+
+        letters = request.get('letters')
+        if not isinstance(letters, str):
+            raise ValueError("Missing letters to find anagrams of")
+        limit = request.get('limit', self.max_results)
+        if limit is None or limit > self.max_results:
+            limit = self.max_results
+        timeout = request.get('timeout', self.timeout)
+        if timeout is None or timeout > self.timeout:
+            timeout = self.timeout
+
+        # The worker gives up by itself at the deadline, but if it's stuck in a long
+        # branch we still answer the request shortly afterwards
+        loop = asyncio.get_running_loop()
+        if op == 'count':
+            future = loop.run_in_executor(self.pool, worker_count, letters, time() + timeout)
+        else:
+            future = loop.run_in_executor(self.pool, worker_find, letters, limit, time() + timeout)
+        try:
+            response = await asyncio.wait_for(asyncio.shield(future), timeout + 1)
+        except (TimeoutError, asyncio.TimeoutError):
+            raise TimeoutError("Search did not finish in {} seconds".format(timeout))
+        if op == 'count':
+            return {'count': response}
+        return {'results': response[0], 'truncated': response[1]}
+
+
+async def serve(a, host, port, path):
+    server = await a.start(host, port, path)
+    asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+    sys.stderr.write("Listening on {}\n".format(path if path is not None else '{}:{}'.format(host, port)))
+    sys.stderr.flush()
+    try:
+        await server.serve_forever()
+    finally:
+        await a.stop()
+        if path is not None and os.path.exists(path):
+            os.remove(path)
+
+
+if __name__ == '__main__':
+    host = DEFAULT_HOST
+    port = DEFAULT_PORT
+    path = None
+    engine = 'auto'
+    options = {}
+    for arg in sys.argv[1:]:
+        arg_found = argument(arg)
+        if arg_found is None:
+            raise Exception("Unexpected argument: {}".format(arg))
+        key = arg_found[0]
+        value = arg_found[1]
+        if key == 'host':
+            host = value
+        elif key == 'port':
+            port = int(value)
+        elif key == 'socket':
+            path = value
+        elif key == 'engine':
+            engine = value
+        elif key in ('procs', 'nocache', 'timeout', 'maxresults'):
+            options[key] = value
+        elif key == 'help':
+            print("Usage: ./server.py [<OPTIONS>]")
+            print()
+            print("Options:")
+            print("    --host=<HOST>     Listens on this address, default {}".format(DEFAULT_HOST))
+            print("    --port=<N>        Listens on this TCP port, default {}".format(DEFAULT_PORT))
+            print("    --socket=<PATH>   Listens on this Unix socket instead of TCP")
+            print("    --engine=<NAME>   Uses the {} engine, or auto to pick one for each request, default auto".format(' or '.join(engines.ENGINES)))
+            print("    --procs=<N>       Runs N many worker processes, default is 1")
+            print("    --nocache         Disables cache, default is on")
+            print("    --timeout=<N>     Sets the max seconds a request can take, default 60")
+            print("    --maxresults=<N>  Sets the max results returned per request, default 100000")
+            print("    --help            Displays this help")
+            print()
+            sys.exit()
+        else:
+            raise Exception("No such argument: {}".format(key))
+
+    a = AnagramServer('dictionary/output.txt', engine, int(options.get('procs', 1)))
+    if 'nocache' in options:
+        a.caching_enabled = False
+    if 'timeout' in options:
+        a.timeout = float(options['timeout'])
+    if 'maxresults' in options:
+        a.max_results = int(options['maxresults'])
+    try:
+        asyncio.run(serve(a, host, port, path))
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        pass
@@ -0,0 +1,179 @@
+#!/usr/bin/python3
+
+import sys
+import wordindex
+import constraints
+from itertools import islice
+from anagram2 import AnagramFinder
+from basefinder import argument, read_phrases
+
+
+# A phrase refined a step at a time, by adding or removing letters or pinning
+# words that every result has to include. The finder's word list, word tree and
+# cache of results are kept from one step to the next. The results for a set of
+# letters don't depend on the phrase they came from, so whatever was found for
+# the last step is reused, and only groups that fit in added letters are looked up.
+
+
+class AnagramSession():
+
+    def __init__(self, finder, letters=''):
+        self.finder = finder
+        self.finder.keep_cache = True
+
+        # Letters still to be made into words, packed, see wordindex
+        self.packed = 0
+        # Words every result includes, whose letters aren't in the pool. They're
+        # the finder's required words, so they count towards its max_words, in
+        # worker processes too, see constraints.words_left
+        self.pinned = []
+        self.finder.required_words = self.pinned
+
+        self.finder.packed = 0
+        self.finder.init_cache()
+        self.finder.init_wordlist_ids([])
+        self.finder.init_wordtree([])
+        self.add_letters(letters)
+
+    def letters(self):
+        return wordindex.packed_to_key(self.packed)
+
+    def add_letters(self, letters):
+        added = wordindex.key_to_packed(self.letter_key(letters))
+        if added == 0:
+            return
+        self.set_packed(self.packed + added)
+
+        # Only the groups with an added letter can be new to the word list
+        added_mask = wordindex.packed_to_mask(added)
+        known = set(self.finder.word_ids)
+        letter_map = self.finder.word_to_letter_map(self.letters())
+        ids = [i for i in self.finder.index.candidates(letter_map, self.finder.numpy_enabled)
+               if self.finder.index.masks[i] & added_mask and i not in known]
+        ids = constraints.filter_wordlist(self.finder.index, ids, self.finder.min_word_length, self.finder.max_word_length,
+                                          self.finder.excluded_words)
+        if len(ids) > 0:
+            self.finder.add_words(ids)
+
+    def remove_letters(self, letters):
+        removed = wordindex.key_to_packed(self.letter_key(letters))
+        packed = wordindex.packed_subtract(self.packed, removed)
+        if packed is None:
+            raise Exception("Letters not in the phrase: {}".format(letters))
+        if removed == 0:
+            return
+        self.set_packed(packed)
+        self.finder.remove_words(packed)
+
+    def pin(self, word):
+        # Take a word's letters out of the pool, and put the word in every result
+        packed = wordindex.packed_subtract(self.packed, wordindex.key_to_packed(self.letter_key(word)))
+        if packed is None:
+            raise Exception("Not enough letters for: {}".format(word))
+        self.pinned.append(word)
+        self.set_packed(packed)
+        self.finder.remove_words(packed)
+
+    def unpin(self, word):
+        if word not in self.pinned:
+            raise Exception("Not pinned: {}".format(word))
+        self.pinned.remove(word)
+        self.add_letters(word)
+
+    def find(self, display=None, limit=None):
+        return sorted(self.find_iter(display, limit))
+
+    def find_iter(self, display=None, limit=None):
+        self.finder.reset_stats()
+        if self.packed == 0:
+            # Only the pinned words are left
+            yield from islice(constraints.required_only(self.pinned, self.finder.max_words), limit)
+            return
+        for result in self.finder.search_iter(display, limit):
+            if len(self.pinned) > 0:
+                result = ' '.join(sorted(result.split(' ') + self.pinned))
+            yield result
+
+    def count(self):
+        self.finder.reset_stats()
+        if self.packed == 0:
+            return len(constraints.required_only(self.pinned, self.finder.max_words))
+        return self.finder.search_count()
+
+    def close(self):
+        self.finder.close()
+
+    def set_packed(self, packed):
+        self.packed = packed
+        self.finder.packed = packed
+
+    def letter_key(self, letters):
+        return self.finder.letter_map_to_key(self.finder.word_to_letter_map(letters))
+
+
+if __name__ == '__main__':
+    # Reads one command per line, printing the results after each:
+    #   +<LETTERS>  adds letters        -<LETTERS>  removes letters
+    #   !<WORD>     pins a word         ?<WORD>     unpins a word
+    #   #           prints the count instead of the results
+    limit = None
+    procs = 1
+    for arg in sys.argv[1:]:
+        arg_found = argument(arg)
+        if arg_found is None:
+            raise Exception("Unexpected argument: {}".format(arg))
+        key = arg_found[0]
+        value = arg_found[1]
+        if key == 'procs':
+            procs = int(value)
+        elif key == 'limit':
+            limit = int(value)
+        elif key == 'help':
+            print("Usage: ./session.py [<OPTIONS>]")
+            print()
+            print("Reads commands from stdin, one per line, and prints the results after each:")
+            print("    +<LETTERS>           Adds letters to the phrase")
+            print("    -<LETTERS>           Removes letters from the phrase")
+            print("    !<WORD>              Pins a word, so every result has it")
+            print("    ?<WORD>              Unpins a word")
+            print("    #                    Prints the number of results")
+            print()
+            print("Options:")
+            print("    --procs=<N>          Runs N many processes, default is 1")
+            print("    --limit=<N>          Prints at most N results after each command")
+            print("    --help               Displays this help")
+            print()
+            sys.exit()
+        else:
+            raise Exception("No such argument: {}".format(key))
+
+    a = AnagramFinder('dictionary/output.txt')
+    a.proc_count = procs
+    s = AnagramSession(a)
+    try:
+        for line in read_phrases('-'):
+            command = line[0]
+            value = line[1:].strip()
+            try:
+                if command == '+':
+                    s.add_letters(value)
+                elif command == '-':
+                    s.remove_letters(value)
+                elif command == '!':
+                    s.pin(value)
+                elif command == '?':
+                    s.unpin(value)
+                elif command != '#':
+                    raise Exception("No such command: {}".format(command))
+            except Exception as e:
+                print("Error: {}".format(e))
+                continue
+            print("# {}{}".format(s.letters(), ''.join([' +' + w for w in s.pinned])))
+            if command == '#':
+                print(s.count())
+            else:
+                for result in s.find(limit=limit):
+                    print(result)
+            sys.stdout.flush()
+    finally:
+        s.close()
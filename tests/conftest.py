@@ -0,0 +1,15 @@
+import os
+import sys
+import pytest
+
+
+# The modules are at the top of the repository, next to the dictionary
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+DICTIONARY = os.path.join(ROOT, 'dictionary', 'output.txt')
+
+
+@pytest.fixture(scope='session')
+def dictionary():
+    return DICTIONARY
@@ -0,0 +1,90 @@
+import pytest
+import anagram
+import anagram2
+import diskmemo
+
+
+# Results kept on disk have to be the same as the ones searched for, whether the
+# memo is new or not, and with workers writing to it at the same time
+
+PHRASES = [
+    'listen',
+    'jordan lewis',
+    'clint eastwood',
+]
+
+
+@pytest.fixture(scope='module')
+def expected(dictionary):
+    a = anagram.AnagramFinder(dictionary)
+    found = dict([(phrase, sorted(a.find(phrase))) for phrase in PHRASES])
+    a.close()
+    return found
+
+
+def memo_finder(dictionary, memo_file, procs):
+    a = anagram2.AnagramFinder(dictionary)
+    a.memo_enabled = True
+    a.memo_file = memo_file
+    a.proc_count = procs
+    a.stats_enabled = True
+    return a
+
+
+@pytest.mark.parametrize('procs', [1, 2])
+def test_cold_and_warm(dictionary, expected, tmp_path, procs):
+    memo_file = str(tmp_path / 'memo.sqlite')
+    for run in ('cold', 'warm'):
+        a = memo_finder(dictionary, memo_file, procs)
+        try:
+            for phrase in PHRASES:
+                assert sorted(a.find(phrase)) == expected[phrase], (run, phrase)
+                if run == 'warm':
+                    assert a.stats.memo_hits > 0
+        finally:
+            a.close()
+
+
+def test_dictionary_changes(tmp_path):
+    filename = tmp_path / 'output.txt'
+    memo_file = str(tmp_path / 'memo.sqlite')
+    filename.write_text('listen\nsilent\n')
+    memo = diskmemo.DiskMemo(str(filename), memo_file)
+    memo.put('key', 'a', 'edges')
+    memo.close()
+
+    memo = diskmemo.DiskMemo(str(filename), memo_file)
+    assert memo.get('key') == ('a', 'edges')
+    memo.close()
+
+    filename.write_text('listen\nsilent\ntinsel\n')
+    memo = diskmemo.DiskMemo(str(filename), memo_file)
+    assert memo.get('key') is None
+    memo.close()
+
+
+@pytest.mark.parametrize('policy', ['lru', 'lfu'])
+def test_size_limit(tmp_path, policy):
+    filename = tmp_path / 'output.txt'
+    filename.write_text('listen\n')
+    memo = diskmemo.DiskMemo(str(filename), str(tmp_path / 'memo.sqlite'), 1000, policy)
+    memo.put('kept', 'a', 'x' * 100)
+    memo.flush()
+    for i in range(0, 30):
+        memo.get('kept')
+        memo.put('key{}'.format(i), 'a', 'x' * 100)
+        memo.flush()
+    size = memo.db.execute('SELECT SUM(LENGTH(edges)) FROM memo').fetchone()[0]
+    assert size <= 1000
+    assert memo.db.execute("SELECT value FROM meta WHERE name = 'bytes'").fetchone()[0] == size
+    # The entry used every time is the one kept
+    assert memo.get('kept') is not None
+    assert memo.get('key0') is None
+    memo.close()
+
+
+def test_no_such_policy(tmp_path):
+    filename = tmp_path / 'output.txt'
+    filename.write_text('listen\n')
+    with pytest.raises(Exception):
+        diskmemo.DiskMemo(str(filename), str(tmp_path / 'memo.sqlite'), policy='nope')
@@ -0,0 +1,197 @@
+import pytest
+import anagram
+import anagram2
+import engines
+from time import time
+from collections import Counter
+
+
+# Every engine, with one or two processes and the cache on or off, has to find
+# the same results, each once, as a plain search of the dictionary that shares
+# none of their code
+
+PHRASES = [
+    'listen',
+    'hello world',
+    'jordan lewis',
+    'snooze alarms',
+    'aabbccddeeff',
+]
+
+KINDS = ['anagram', 'anagram2', 'auto']
+
+SETUPS = [(kind, procs, caching_enabled) for kind in KINDS for procs in (1, 2) for caching_enabled in (True, False)]
+
+
+def make_finder(dictionary, kind):
+    if kind == 'anagram':
+        return anagram.AnagramFinder(dictionary)
+    if kind == 'anagram2':
+        return anagram2.AnagramFinder(dictionary)
+    return engines.AnagramFinder(dictionary)
+
+
+@pytest.fixture(scope='module')
+def finders(dictionary):
+    # Made once each, as starting the workers takes longer than the searches
+    made = {}
+
+    def get(kind, procs, caching_enabled):
+        if (kind, procs, caching_enabled) not in made:
+            a = make_finder(dictionary, kind)
+            a.proc_count = procs
+            a.caching_enabled = caching_enabled
+            made[(kind, procs, caching_enabled)] = a
+        return made[(kind, procs, caching_enabled)]
+
+    yield get
+    for a in made.values():
+        a.close()
+
+
+def letter_counts(text):
+    return Counter([l for l in text.lower() if 'a' <= l <= 'z'])
+
+
+def fits(counts, left):
+    return all([left[l] >= n for l, n in counts.items()])
+
+
+def read_dictionary(dictionary):
+    # Each word with its letters
+    words = []
+    f = open(dictionary)
+    try:
+        for line in f:
+            fields = line.split()
+            if len(fields) > 0 and len(letter_counts(fields[0])) > 0:
+                words.append((fields[0], letter_counts(fields[0])))
+    finally:
+        f.close()
+    return words
+
+
+def brute_force(dictionary_words, phrase):
+    # Every set of words in the dictionary that uses up the letters, trying the
+    # words that fit in turn, each with only the words from it on that fit in
+    # the letters left after it
+    letters = letter_counts(phrase)
+    words = [entry for entry in dictionary_words if fits(entry[1], letters)]
+    results = []
+
+    def search(left, words, used):
+        if len(left) == 0:
+            results.append(' '.join(sorted(used)))
+            return
+        for i, (word, counts) in enumerate(words):
+            next_left = left - counts
+            search(next_left, [entry for entry in words[i:] if fits(entry[1], next_left)], used + [word])
+
+    search(letters, words, [])
+    return sorted(results)
+
+
+@pytest.fixture(scope='module')
+def expected(dictionary):
+    dictionary_words = read_dictionary(dictionary)
+    return dict([(phrase, brute_force(dictionary_words, phrase)) for phrase in PHRASES])
+
+
+@pytest.mark.parametrize('phrase', PHRASES)
+@pytest.mark.parametrize('kind,procs,caching_enabled', SETUPS)
+def test_find(finders, expected, kind, procs, caching_enabled, phrase):
+    results = finders(kind, procs, caching_enabled).find(phrase)
+    assert results == expected[phrase]
+    assert len(set(results)) == len(results)
+
+
+@pytest.mark.parametrize('phrase', PHRASES)
+@pytest.mark.parametrize('kind,procs,caching_enabled', SETUPS)
+def test_count(finders, expected, kind, procs, caching_enabled, phrase):
+    assert finders(kind, procs, caching_enabled).count(phrase) == len(expected[phrase])
+
+
+@pytest.mark.parametrize('phrase', PHRASES)
+@pytest.mark.parametrize('kind,procs,caching_enabled', SETUPS)
+def test_limit(finders, expected, kind, procs, caching_enabled, phrase):
+    results = finders(kind, procs, caching_enabled).find(phrase, limit=5)
+    assert len(results) == min(5, len(expected[phrase]))
+    assert len(set(results)) == len(results)
+    assert set(results) <= set(expected[phrase])
+
+
+@pytest.mark.parametrize('phrase', PHRASES)
+@pytest.mark.parametrize('kind,procs,caching_enabled', SETUPS)
+def test_max_words(finders, expected, kind, procs, caching_enabled, phrase):
+    a = finders(kind, procs, caching_enabled)
+    a.max_words = 2
+    try:
+        results = a.find(phrase)
+        count = a.count(phrase)
+    finally:
+        a.max_words = None
+    assert results == [result for result in expected[phrase] if len(result.split(' ')) <= 2]
+    assert count == len(results)
+
+
+def test_find_many(finders, expected):
+    a = finders('auto', 1, True)
+    assert list(a.find_many(PHRASES)) == [(phrase, expected[phrase]) for phrase in PHRASES]
+
+
+def test_choose_engine():
+    # Few different letters suit the word list, more suit the word tree
+    assert engines.choose_engine('aabbccddeeff') == 'anagram'
+    assert engines.choose_engine('jordan lewis') == 'anagram2'
+
+
+def test_engine_setting(dictionary):
+    a = engines.AnagramFinder(dictionary, 'anagram')
+    try:
+        a.find('jordan lewis')
+        assert list(a.finders.keys()) == ['anagram']
+    finally:
+        a.close()
+    with pytest.raises(Exception):
+        engines.AnagramFinder(dictionary, 'nope')
+
+
+@pytest.mark.parametrize('kind', KINDS)
+@pytest.mark.parametrize('op', ['find', 'count'])
+def test_deadline(dictionary, kind, op):
+    # Both finding and counting give up at the deadline, whichever engine it is
+    a = make_finder(dictionary, kind)
+    a.deadline = time() + 0.5
+    start_time = time()
+    try:
+        with pytest.raises(TimeoutError):
+            getattr(a, op)('a decimal point im a dot in place')
+    finally:
+        a.close()
+    assert time() - start_time < 5
+
+
+@pytest.mark.parametrize('procs', [1, 2])
+def test_kept_cache_word_limits(dictionary, procs):
+    # A cache kept from one search to the next isn't used once the words allowed
+    # change, and workers use the same words
+    a = anagram2.AnagramFinder(dictionary)
+    reference = anagram2.AnagramFinder(dictionary)
+    a.keep_cache = True
+    a.proc_count = procs
+    try:
+        a.find('clint eastwood')
+        a.min_word_length = 4
+        reference.min_word_length = 4
+        assert sorted(a.find('clint eastwood')) == sorted(reference.find('clint eastwood'))
+        a.min_word_length = None
+        a.excluded_words = {'clean'}
+        reference.min_word_length = None
+        reference.excluded_words = {'clean'}
+        assert sorted(a.find('clint eastwood')) == sorted(reference.find('clint eastwood'))
+        a.find('jordan lewis')
+        a.max_word_length = 3
+        reference.max_word_length = 3
+        assert sorted(a.find('jordan lewis')) == sorted(reference.find('jordan lewis'))
+    finally:
+        a.close()
@@ -0,0 +1,57 @@
+import pytest
+import ranking
+import engines
+
+
+# The best results have to be the ones sorting every result by its score would put first
+
+PHRASES = [
+    'listen',
+    'hello world',
+    'jordan lewis',
+    'clint eastwood',
+]
+
+
+@pytest.fixture(scope='module')
+def finder(dictionary):
+    a = engines.AnagramFinder(dictionary)
+    yield a
+    a.close()
+
+
+def result_score(a, result):
+    word_score = ranking.word_scorer(None, a.word_frequencies)
+    return sum([word_score(word) for word in result.split(' ')])
+
+
+@pytest.mark.parametrize('phrase', PHRASES)
+@pytest.mark.parametrize('k', [1, 10])
+def test_top_matches_sort(finder, phrase, k):
+    top = finder.find_top(phrase, k)
+    scores = sorted([result_score(finder, result) for result in finder.find(phrase)], reverse=True)
+    assert len(top) == min(k, len(scores))
+    assert len(set(top)) == len(top)
+    assert [result_score(finder, result) for result in top] == pytest.approx(scores[:k])
+
+
+def test_fewest_words_first(finder):
+    results = finder.find('clint eastwood')
+    fewest = min([len(result.split(' ')) for result in results])
+    for result in finder.find_top('clint eastwood', 20):
+        assert len(result.split(' ')) == fewest
+
+
+def test_default_score():
+    # Another word costs more than any lengths or frequencies make up for
+    assert ranking.default_score('a', 0) * 2 < ranking.default_score('abcdefghijklmnopqrstuvwxyz' * 10, 0)
+    # Then longer words come first, then more used ones
+    assert ranking.default_score('ab', 0) * 2 < ranking.default_score('a', 0) + ranking.default_score('abc', 0)
+    assert ranking.default_score('ab', 0) < ranking.default_score('ab', 1000)
+
+
+def test_own_score(finder):
+    # With a score preferring more words, the results with the most words come first
+    top = finder.find_top('listen', 1, lambda word, frequency: 1)
+    assert top == [' '.join(sorted(top[0].split(' ')))]
+    assert len(top[0].split(' ')) == max([len(result.split(' ')) for result in finder.find('listen')])
@@ -0,0 +1,78 @@
+import pytest
+import resultcache
+
+
+def edges(n):
+    return [(i, 1, ['word'], None) for i in range(0, n)]
+
+
+def make_cache(policy, entries):
+    # Room for this many entries of one edge each
+    return resultcache.ResultCache(resultcache.entry_bytes(edges(1)) * entries, policy)
+
+
+def test_get_put():
+    cache = make_cache('lru', 10)
+    assert cache.get('a') is None
+    cache.put('a', edges(1), 3)
+    assert cache.get('a') == [edges(1), 3]
+    cache.put('a', edges(1), 0)
+    assert cache.get('a') == [edges(1), 0]
+    assert len(cache) == 1
+    assert (cache.hits, cache.misses) == (2, 1)
+
+
+def test_lru():
+    cache = make_cache('lru', 2)
+    cache.put('a', edges(1), 0)
+    cache.put('b', edges(1), 0)
+    cache.get('a')
+    assert cache.put('c', edges(1), 0) == 1
+    assert cache.get('b') is None
+    assert cache.get('a') is not None
+
+
+def test_lfu():
+    cache = make_cache('lfu', 2)
+    cache.put('a', edges(1), 0)
+    cache.put('b', edges(1), 0)
+    cache.get('b')
+    cache.get('b')
+    cache.get('a')
+    cache.put('c', edges(1), 0)
+    assert cache.get('a') is None
+    assert cache.get('b') is not None
+
+
+def test_size():
+    # The biggest entry goes first, so as few as possible are taken out
+    cache = resultcache.ResultCache(resultcache.entry_bytes(edges(10)) + resultcache.entry_bytes(edges(1)), 'size')
+    cache.put('big', edges(10), 0)
+    cache.put('a', edges(1), 0)
+    assert cache.put('b', edges(1), 0) == 1
+    assert cache.get('big') is None
+    assert cache.get('a') is not None and cache.get('b') is not None
+
+
+@pytest.mark.parametrize('policy', sorted(resultcache.POLICIES))
+def test_stays_under_limit(policy):
+    cache = make_cache(policy, 5)
+    for i in range(0, 100):
+        cache.put(i, edges(i % 3 + 1), 0)
+        cache.get(i // 2)
+        assert cache.bytes <= cache.max_bytes
+    assert cache.bytes == sum([resultcache.entry_bytes(entry[0]) for entry in cache.entries.values()])
+
+
+@pytest.mark.parametrize('policy', sorted(resultcache.POLICIES))
+def test_too_big(policy):
+    cache = make_cache(policy, 2)
+    cache.put('a', edges(1), 0)
+    cache.put('big', edges(10), 0)
+    assert cache.get('big') is None
+    assert cache.bytes == 0 and len(cache) == 0
+
+
+def test_no_such_policy():
+    with pytest.raises(Exception):
+        resultcache.ResultCache(1000, 'nope')
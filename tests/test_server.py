@@ -0,0 +1,60 @@
+import os
+import sys
+import time
+import subprocess
+import pytest
+import anagram2
+from client import AnagramClient
+from conftest import ROOT
+
+
+@pytest.fixture(scope='module')
+def server(tmp_path_factory):
+    # One worker, so a request it doesn't give up on holds up the ones after it
+    path = str(tmp_path_factory.mktemp('server') / 'anagram.sock')
+    process = subprocess.Popen([sys.executable, os.path.join(ROOT, 'server.py'), '--socket=' + path, '--timeout=1'],
+                               cwd=ROOT, stderr=subprocess.DEVNULL)
+    try:
+        for i in range(0, 300):
+            if os.path.exists(path):
+                break
+            time.sleep(0.1)
+        yield path
+    finally:
+        process.terminate()
+        process.wait()
+
+
+@pytest.fixture
+def client(server):
+    c = AnagramClient(path=server)
+    yield c
+    c.close()
+
+
+def test_find(dictionary, client):
+    expected = anagram2.AnagramFinder(dictionary).find('jordan lewis')
+    assert client.find('jordan lewis') == expected
+    assert client.count('jordan lewis') == len(expected)
+
+
+def test_limit(client):
+    response = client.request({'op': 'find', 'letters': 'jordan lewis', 'limit': 5})
+    assert len(response['results']) == 5
+    assert response['truncated']
+
+
+def test_bad_request(client):
+    with pytest.raises(Exception):
+        client.request({'op': 'nope'})
+    with pytest.raises(Exception):
+        client.request({'op': 'find'})
+
+
+def test_timeout(client):
+    # A count that runs past the deadline is given up on, and the worker is free straight away
+    with pytest.raises(Exception, match='did not finish'):
+        client.count('a decimal point im a dot in place')
+    start_time = time.time()
+    assert len(client.find('listen')) == 20
+    assert time.time() - start_time < 3
@@ -0,0 +1,62 @@
+import pytest
+import anagram2
+import session
+
+
+@pytest.fixture
+def finder(dictionary):
+    a = anagram2.AnagramFinder(dictionary)
+    yield a
+    a.close()
+
+
+def test_steps_match_find(dictionary, finder):
+    # Each step finds what a new search of the same letters would
+    reference = anagram2.AnagramFinder(dictionary)
+    s = session.AnagramSession(finder, 'hello')
+    assert s.find() == reference.find('hello')
+    s.add_letters('world')
+    assert s.find() == reference.find('hello world')
+    assert s.count() == len(reference.find('hello world'))
+    s.remove_letters('hello')
+    assert s.find() == reference.find('world')
+
+
+def test_pin(dictionary, finder):
+    reference = anagram2.AnagramFinder(dictionary)
+    reference.required_words = ['low']
+    s = session.AnagramSession(finder, 'hello world')
+    s.pin('low')
+    assert s.find() == reference.find('hello world')
+    assert s.count() == reference.count('hello world')
+    s.unpin('low')
+    assert s.pinned == []
+    with pytest.raises(Exception):
+        s.pin('zebra')
+
+
+@pytest.mark.parametrize('procs', [1, 2])
+def test_word_limits(dictionary, finder, procs):
+    # The word length limits and excluded words apply to the words a session adds,
+    # and pinned words count towards the most words a result can have
+    reference = anagram2.AnagramFinder(dictionary)
+    for a in (finder, reference):
+        a.min_word_length = 4
+        a.excluded_words = {'clean'}
+    finder.proc_count = procs
+    s = session.AnagramSession(finder, 'clint')
+    s.add_letters('eastwood')
+    assert s.find() == reference.find('clint eastwood')
+
+    for a in (finder, reference):
+        a.max_words = 2
+    reference.required_words = ['low']
+    s = session.AnagramSession(finder, 'hello world')
+    s.pin('low')
+    assert s.find() == reference.find('hello world')
+    assert s.count() == 0
+    s.pin('hell')
+    s.pin('rod')
+    assert s.find() == [] and s.count() == 0
+    finder.max_words = 3
+    assert s.find() == ['hell low rod'] and s.count() == 1
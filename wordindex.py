@@ -0,0 +1,440 @@
+#!/usr/bin/python3
+
+import sys
+import os
+import mmap
+import struct
+from array import array
+import importlib.util
+
+
+# NumPy is only imported once something needs it, as importing it takes longer
+# than finding the anagrams of a short phrase, see load_numpy
+NUMPY_INSTALLED = importlib.util.find_spec('numpy') is not None
+numpy = None
+
+# Fewest groups to compare against the letters before it's worth using NumPy
+NUMPY_MIN_GROUPS = 20000
+
+
+ALLOWED_LETTERS = 'abcdefghijklmnopqrstuvwxyz'
+LETTER_COUNT = len(ALLOWED_LETTERS)
+
+INDEX_MAGIC = b'ANAGIDX1'
+INDEX_VERSION = 2
+
+# magic, version, group count, word count, max key length, source size,
+# source mtime, the offset of each section, then the highest word frequency
+INDEX_HEADER = struct.Struct('<8sIIIIQQ8QI')
+
+
+def index_filename(filename):
+    return os.path.splitext(filename)[0] + '.idx'
+
+
+def word_to_key(word):
+    return ''.join(sorted([l for l in word.lower() if l in ALLOWED_LETTERS]))
+
+
+def key_to_vector(key):
+    vector = bytearray(LETTER_COUNT)
+    for l in key:
+        vector[ord(l) - 97] += 1
+    return bytes(vector)
+
+
+def key_to_mask(key):
+    mask = 0
+    for l in key:
+        mask |= 1 << (ord(l) - 97)
+    return mask
+
+
+# Letter counts can also be packed into an integer, one byte per letter. The top
+# bit of each byte is kept clear, so when it is set before a subtraction it's
+# only still set afterwards if there were enough of that letter
+PACKED_GUARD = int.from_bytes(b'\x80' * LETTER_COUNT, 'little')
+PACKED_MAX_COUNT = 127
+
+
+def key_to_packed(key):
+    for l in set(key):
+        if key.count(l) > PACKED_MAX_COUNT:
+            raise Exception("Too many of letter {}, at most {} are supported".format(l, PACKED_MAX_COUNT))
+    return int.from_bytes(key_to_vector(key), 'little')
+
+
+def packed_subtract(packed, word_packed):
+    letters_left = (packed | PACKED_GUARD) - word_packed
+    if letters_left & PACKED_GUARD != PACKED_GUARD:
+        return None
+    return letters_left ^ PACKED_GUARD
+
+
+# Turns each letter's count into an ASCII 0 or 1, so the letters present can be read as a binary number
+MASK_DIGITS = bytes([48] + [49] * 255)
+
+
+def packed_to_mask(packed):
+    # Bit mask of the letters present, the same as key_to_mask, with a in the lowest bit
+    return int(packed.to_bytes(LETTER_COUNT, 'big').translate(MASK_DIGITS), 2)
+
+
+def packed_letters(packed):
+    # List of (bit shift, count) for each letter present
+    return [(i * 8, c) for i, c in enumerate(packed.to_bytes(LETTER_COUNT, 'little')) if c > 0]
+
+
+def packed_to_key(packed):
+    return ''.join([ALLOWED_LETTERS[i] * c for i, c in enumerate(packed.to_bytes(LETTER_COUNT, 'little'))])
+
+
+def load_numpy():
+    global numpy
+    if numpy is None and NUMPY_INSTALLED:
+        import numpy
+    return numpy
+
+
+def packed_to_array(packed):
+    return numpy.frombuffer(packed.to_bytes(LETTER_COUNT, 'little'), dtype=numpy.uint8)
+
+
+def read_words(filename):
+    # Yield each word in the dictionary along with how often it's used, which is
+    # an optional second column, or 0 if it's not given
+    f = open(filename)
+    try:
+        for line in f:
+            fields = line.split()
+            if len(fields) == 0:
+                continue
+            yield fields[0], int(fields[1]) if len(fields) > 1 else 0
+    finally:
+        f.close()
+
+
+def group_words(words):
+    # Group (word, frequency) pairs by anagram key
+    groups = {}
+    for word, frequency in words:
+        key = word_to_key(word)
+        if key == '':
+            continue
+        if key not in groups:
+            groups[key] = []
+        groups[key].append((word, frequency))
+    return groups
+
+
+def build_index(filename, index_file=None):
+    # Group the words in the dictionary by anagram key
+    groups = group_words(read_words(filename))
+
+    # Order the groups longest first, then alphabetically by key, so each
+    # word length is a contiguous, sorted run of the index
+    keys = sorted(groups.keys(), key=lambda k: (-len(k), k))
+    max_key_length = len(keys[0]) if len(keys) > 0 else 0
+
+    vectors = bytearray()
+    masks = array('I')
+    frequencies = array('I')
+    key_offsets = array('I', [0])
+    key_blob = bytearray()
+    word_offsets = array('I', [0])
+    word_blob = bytearray()
+    word_count = 0
+    for key in keys:
+        vectors += key_to_vector(key)
+        masks.append(key_to_mask(key))
+        key_blob += key.encode('ascii')
+        key_offsets.append(len(key_blob))
+        words = group_order(groups[key])
+        frequencies.append(words[0][1])
+        word_blob += '\n'.join([word for word, frequency in words]).encode('utf-8')
+        word_offsets.append(len(word_blob))
+        word_count += len(words)
+
+    # Index of the first group with each length or shorter
+    length_starts = array('I')
+    i = 0
+    for l in range(max_key_length, -1, -1):
+        while i < len(keys) and len(keys[i]) > l:
+            i += 1
+        length_starts.append(i)
+    length_starts.reverse()
+
+    return write_index(filename, index_file, len(keys), word_count, max_key_length,
+                       [vectors, masks, key_offsets, key_blob, word_offsets, word_blob, length_starts, frequencies])
+
+
+def group_order(words):
+    # The most used words of each group come first
+    return sorted(words, key=lambda wf: (-wf[1], wf[0]))
+
+
+def patch_index(previous, filename, changes, index_file=None):
+    # Build the index from a previous one, with the groups whose keys are in
+    # changes given the (word, frequency) pairs there, or taken out if there are
+    # none. The rest of the previous index is copied across as it is, a run of
+    # unchanged groups at a time, rather than worked out again
+    replaced = {}
+    inserted = {}
+    for key, words in changes.items():
+        i = previous.find_key(key)
+        if i is not None:
+            replaced[i] = words
+        elif len(words) > 0:
+            inserted.setdefault(previous.key_position(key), []).append(key)
+
+    vectors = bytearray()
+    masks = array('I')
+    frequencies = array('I')
+    key_offsets = array('I', [0])
+    key_blob = bytearray()
+    word_offsets = array('I', [0])
+    word_blob = bytearray()
+    word_count = previous.word_count
+    # Change in the number of groups longer than each length
+    length_changes = {}
+
+    def copy(start, stop):
+        vectors.extend(previous.vectors[start * LETTER_COUNT:stop * LETTER_COUNT])
+        masks.frombytes(previous.masks[start:stop].tobytes())
+        frequencies.frombytes(previous.frequencies[start:stop].tobytes())
+        for offsets, blob, previous_offsets, previous_blob in (
+                (key_offsets, key_blob, previous.key_offsets, previous.key_blob),
+                (word_offsets, word_blob, previous.word_offsets, previous.word_blob)):
+            shift = len(blob) - previous_offsets[start]
+            blob.extend(previous_blob[previous_offsets[start]:previous_offsets[stop]])
+            offsets.extend([offset + shift for offset in previous_offsets[start + 1:stop + 1]])
+
+    def add(key, words):
+        vectors.extend(key_to_vector(key))
+        masks.append(key_to_mask(key))
+        key_blob.extend(key.encode('ascii'))
+        key_offsets.append(len(key_blob))
+        words = group_order(words)
+        frequencies.append(words[0][1])
+        word_blob.extend('\n'.join([word for word, frequency in words]).encode('utf-8'))
+        word_offsets.append(len(word_blob))
+
+    i = 0
+    for position in sorted(set(replaced.keys()) | set(inserted.keys())):
+        copy(i, position)
+        i = position
+        for key in sorted(inserted.get(position, [])):
+            add(key, changes[key])
+            word_count += len(changes[key])
+            length_changes[len(key)] = length_changes.get(len(key), 0) + 1
+        if position in replaced:
+            word_count -= len(previous.words(position))
+            words = replaced[position]
+            if len(words) > 0:
+                add(previous.key(position), words)
+                word_count += len(words)
+            else:
+                key_length = previous.key_offsets[position + 1] - previous.key_offsets[position]
+                length_changes[key_length] = length_changes.get(key_length, 0) - 1
+            i = position + 1
+    copy(i, previous.group_count)
+
+    group_count = len(masks)
+    max_key_length = key_offsets[1] - key_offsets[0] if group_count > 0 else 0
+    length_starts = array('I')
+    for l in range(0, max_key_length + 1):
+        length_starts.append(previous.length_start(l) + sum([n for key_length, n in length_changes.items() if key_length > l]))
+
+    return write_index(filename, index_file, group_count, word_count, max_key_length,
+                       [vectors, masks, key_offsets, key_blob, word_offsets, word_blob, length_starts, frequencies])
+
+
+def write_index(filename, index_file, group_count, word_count, max_key_length, sections):
+    if index_file is None:
+        index_file = index_filename(filename)
+    max_frequency = max(sections[7], default=0)
+    sections = [bytes(section) if isinstance(section, bytearray) else section.tobytes() for section in sections]
+
+    # Work out where each section lives, keeping every section 4-byte aligned
+    offsets = []
+    offset = INDEX_HEADER.size
+    for section in sections:
+        offsets.append(offset)
+        offset += len(section)
+        offset += -offset % 4
+
+    stat = os.stat(filename)
+    data = bytearray(INDEX_HEADER.pack(
+        INDEX_MAGIC, INDEX_VERSION, group_count, word_count, max_key_length,
+        stat.st_size, stat.st_mtime_ns, *offsets, max_frequency))
+    for section in sections:
+        data += section
+        data += bytes(-len(data) % 4)
+
+    # Write to a temporary file and swap it in, so concurrent readers
+    # never see a half written index
+    try:
+        tmp_file = '{}.{}.tmp'.format(index_file, os.getpid())
+        f = open(tmp_file, 'wb')
+        f.write(data)
+        f.close()
+        os.replace(tmp_file, index_file)
+    except OSError:
+        pass
+    return bytes(data)
+
+
+def open_index(filename, index_file=None):
+    # The existing index if it was built from this version of the dictionary, otherwise None
+    if index_file is None:
+        index_file = index_filename(filename)
+    try:
+        stat = os.stat(filename)
+        f = open(index_file, 'rb')
+        try:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        finally:
+            f.close()
+        header = INDEX_HEADER.unpack_from(data)
+        if header[0] == INDEX_MAGIC and header[1] == INDEX_VERSION \
+                and header[5] == stat.st_size and header[6] == stat.st_mtime_ns:
+            return WordIndex(data)
+        data.close()
+    except (OSError, ValueError, struct.error):
+        pass
+    return None
+
+
+def load_index(filename, index_file=None):
+    index = open_index(filename, index_file)
+    if index is None:
+        index = WordIndex(build_index(filename, index_file))
+    return index
+
+
+class WordIndex():
+
+    def __init__(self, data):
+        self.data = data
+        header = INDEX_HEADER.unpack_from(data)
+        self.group_count = header[2]
+        self.word_count = header[3]
+        self.max_key_length = header[4]
+        offsets = header[7:15]
+        self.max_frequency = header[15]
+
+        n = self.group_count
+        view = memoryview(data)
+        self.vectors = view[offsets[0]:offsets[0] + n * LETTER_COUNT]
+        self.masks = view[offsets[1]:offsets[1] + n * 4].cast('I')
+        self.key_offsets = view[offsets[2]:offsets[2] + (n + 1) * 4].cast('I')
+        self.key_blob = view[offsets[3]:offsets[3] + self.key_offsets[n]]
+        self.word_offsets = view[offsets[4]:offsets[4] + (n + 1) * 4].cast('I')
+        self.word_blob = view[offsets[5]:offsets[5] + self.word_offsets[n]]
+        self.length_starts = view[offsets[6]:offsets[6] + (self.max_key_length + 1) * 4].cast('I')
+        self.frequencies = view[offsets[7]:offsets[7] + n * 4].cast('I')
+
+        # With NumPy, the letter count vectors are also an (N x 26) matrix, and the
+        # masks an array, made the first time they're needed, see get_matrix
+        self.matrix = None
+        self.mask_array = None
+
+    def get_matrix(self):
+        if self.matrix is None and load_numpy() is not None:
+            self.matrix = numpy.frombuffer(self.vectors, dtype=numpy.uint8).reshape(self.group_count, LETTER_COUNT)
+            self.mask_array = numpy.frombuffer(self.masks, dtype=numpy.uint32)
+        return self.matrix
+
+    def __len__(self):
+        return self.group_count
+
+    def key(self, i):
+        return str(self.key_blob[self.key_offsets[i]:self.key_offsets[i + 1]], 'ascii')
+
+    def vector(self, i):
+        return self.vectors[i * LETTER_COUNT:(i + 1) * LETTER_COUNT]
+
+    def packed(self, i):
+        return int.from_bytes(self.vector(i), 'little')
+
+    def letter_map(self, i):
+        letter_map = {}
+        for l in self.key(i):
+            if l not in letter_map:
+                letter_map[l] = 0
+            letter_map[l] += 1
+        return letter_map
+
+    def words(self, i):
+        return str(self.word_blob[self.word_offsets[i]:self.word_offsets[i + 1]], 'utf-8').split('\n')
+
+    def by_frequency(self, ids):
+        # The groups in order of how often their most used word is, keeping
+        # groups of each length together, longest first
+        if self.max_frequency == 0:
+            return ids
+        key_offsets = self.key_offsets
+        frequencies = self.frequencies
+        return sorted(ids, key=lambda i: (key_offsets[i] - key_offsets[i + 1], -frequencies[i]))
+
+    def length_start(self, length):
+        # Index of the first group with at most this many letters
+        if length < 0:
+            return self.group_count
+        if length > self.max_key_length:
+            return 0
+        return self.length_starts[length]
+
+    def find_key(self, key):
+        i = self.key_position(key)
+        if i < self.group_count and self.key(i) == key:
+            return i
+        return None
+
+    def key_position(self, key):
+        # Binary search the run of groups with the same length as the key, for
+        # where it is, or would be put
+        lo = self.length_start(len(key))
+        hi = self.length_start(len(key) - 1)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.key(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def candidates(self, letter_map, use_numpy=False):
+        # Return the index of every group that can be made from the letters. Groups
+        # with more letters are never looked at, and most of the rest are rejected
+        # on their letter mask alone, so only the groups that fit are made into a list
+        key = ''.join([l * n for l, n in sorted(letter_map.items())])
+        vector = key_to_vector(key)
+        start = self.length_start(len(key))
+        excluded = ~key_to_mask(key) & ((1 << LETTER_COUNT) - 1)
+
+        # With enough groups, compare the masks and then the groups left against the letters in one go
+        if use_numpy and self.group_count - start >= NUMPY_MIN_GROUPS and self.get_matrix() is not None:
+            rows = numpy.flatnonzero((self.mask_array[start:] & excluded) == 0) + start
+            fits = numpy.all(self.matrix[rows] <= numpy.frombuffer(vector, dtype=numpy.uint8), axis=1)
+            return rows[fits].tolist()
+
+        # Otherwise check them one at a time
+        found = []
+        masks = self.masks
+        vectors = self.vectors
+        for i in range(start, self.group_count):
+            if masks[i] & excluded:
+                continue
+            word_vector = vectors[i * LETTER_COUNT:(i + 1) * LETTER_COUNT]
+            for a, b in zip(word_vector, vector):
+                if a > b:
+                    break
+            else:
+                found.append(i)
+        return found
+
+if __name__ == '__main__':
+    filename = sys.argv[1] if len(sys.argv) > 1 else 'dictionary/output.txt'
+    index = WordIndex(build_index(filename))
+    print("Wrote {} ({} words in {} anagram groups)".format(index_filename(filename), index.word_count, len(index)))
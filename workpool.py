@@ -0,0 +1,197 @@
+import os
+import zlib
+import cProfile
+import searchstats
+from array import array
+from collections import deque
+from time import time
+
+
+# A pool of worker processes kept between searches, shared by both engines.
+# The top level words are handed out a chunk at a time, smaller chunks towards
+# the end, and a worker takes the next task as soon as it finishes one. If a task
+# runs long, the worker hands back the part it didn't get to, and if that's the
+# search below a single word, it's split up between the workers.
+#
+# A task is (start, stop, sub_start, sub_stop). Without sub_start it's the top
+# level words from start to stop, otherwise it's the single top level word start,
+# followed only by words from sub_start to sub_stop. What the positions of the
+# following words mean is up to the engine.
+#
+# Workers are only given the finder's class and the dictionary's filename, and load
+# the dictionary index themselves, which is mapped into memory so it's shared between
+# them. The word list for a search is put in shared memory once, as the index ids of
+# its groups, so workers don't have to filter the dictionary themselves. The results
+# of each task are sent back as one compressed block of lines, see pack_results,
+# which is smaller than a list of strings and quicker to unpickle.
+#
+# multiprocessing and concurrent.futures are only imported once a pool is started,
+# so searches in a single process don't spend time loading them.
+
+
+# Each worker process keeps its own finder, so the dictionary is only loaded once per worker
+finder = None
+finder_query = None
+# When the worker last finished a task, and its profiler, if profiling
+last_task_end = None
+profiler = None
+
+
+def init_worker(finder_class, filename):
+    global finder
+    finder = finder_class(filename)
+
+
+def run_task(query, letters, table_name, table_size, settings, limit, task, submitted):
+    global finder_query, last_task_end, profiler
+    start_time = time()
+    # Set up the word list the first time a worker sees a search, and
+    # keep the cache between tasks from the same search
+    if query != finder_query:
+        for key, value in settings.items():
+            setattr(finder, key, value)
+        finder.prepare(letters, read_table(table_name, table_size))
+        finder_query = query
+
+    # Each task has its own stats, which are added up by the coordinator
+    if finder.stats_enabled:
+        finder.stats = searchstats.SearchStats()
+    if finder.profile_dir is not None and profiler is None:
+        profiler = cProfile.Profile()
+    if profiler is not None:
+        profiler.enable()
+    try:
+        results, leftover, words_done = finder.run_task(task, limit)
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            searchstats.dump_profile(profiler, finder.profile_dir, 'worker-{}'.format(os.getpid()))
+    packed = pack_results(results)
+
+    stats = None
+    if finder.stats_enabled:
+        stats = finder.stats
+        stats.tasks = 1
+        stats.results_sent = len(results)
+        stats.bytes_sent = len(packed)
+        # The worker was idle from when it finished its last task, or when this
+        # task was handed out if that's later, until it started this one
+        idle = start_time - max(submitted, last_task_end or 0)
+        stats.workers[os.getpid()] = (time() - start_time, max(idle, 0))
+    last_task_end = time()
+    return packed, leftover, words_done, stats
+
+
+# Results are strings without line breaks, so they're joined into lines, and
+# compressed as quickly as zlib can, which still takes them to about a fifth
+
+def pack_results(results):
+    return zlib.compress('\n'.join(results).encode('utf-8'), 1)
+
+
+def unpack_results(packed):
+    text = zlib.decompress(packed).decode('utf-8')
+    if text == '':
+        return []
+    return text.split('\n')
+
+
+def write_table(ids):
+    from multiprocessing import shared_memory
+    table = shared_memory.SharedMemory(create=True, size=max(len(ids), 1) * 4)
+    table.buf[:len(ids) * 4] = array('i', ids).tobytes()
+    return table
+
+
+def read_table(name, size):
+    from multiprocessing import shared_memory
+    table = shared_memory.SharedMemory(name=name)
+    try:
+        return array('i', bytes(table.buf[:size * 4])).tolist()
+    finally:
+        table.close()
+
+
+class WorkPool():
+
+    def __init__(self, finder_class, filename, proc_count, start_method=None):
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+        self.proc_count = proc_count
+        self.start_method = start_method
+        self.executor = ProcessPoolExecutor(
+            max_workers=proc_count,
+            mp_context=multiprocessing.get_context(start_method),
+            initializer=init_worker,
+            initargs=(finder_class, filename))
+        self.query_count = 0
+
+        # Tasks kept queued up per worker, so a worker never waits on the coordinator
+        self.tasks_per_proc = 2
+        # Number of chunks of the remaining words to aim for per worker
+        self.chunks_per_proc = 4
+
+    def close(self):
+        # Waits for the tasks already running, which are no longer than task_time_slice,
+        # so the workers aren't torn down while the exit hook is still talking to them
+        self.executor.shutdown(wait=True, cancel_futures=True)
+
+    def run(self, letters, ids, settings, start, stop, limit=None, display=None, stats=None):
+        # Yields the results of each task as it finishes, waiting on
+        # the workers rather than polling them
+        from concurrent.futures import wait, FIRST_COMPLETED
+        self.query_count += 1
+        query = self.query_count
+        table = write_table(ids)
+        pending = deque()
+        running = set()
+        next_word = start
+        done = 0
+        if display is not None:
+            display(0, 1)
+        try:
+            while True:
+                while len(running) < self.proc_count * self.tasks_per_proc:
+                    if len(pending) > 0:
+                        task = pending.popleft()
+                    elif next_word < stop:
+                        size = max(1, (stop - next_word) // (self.proc_count * self.chunks_per_proc))
+                        task = (next_word, next_word + size, None, None)
+                        next_word += size
+                    else:
+                        break
+                    running.add(self.executor.submit(run_task, query, letters, table.name, len(ids), settings, limit, task, time()))
+                if len(running) == 0:
+                    break
+
+                finished, running = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    results, leftover, words_done, task_stats = future.result()
+                    if stats is not None:
+                        stats.merge(task_stats)
+                    for task in reversed(leftover):
+                        if task[2] is not None:
+                            # The search below one word is taking a while, so share it out
+                            for part in reversed(self.split(task)):
+                                pending.appendleft(part)
+                        else:
+                            pending.appendleft(task)
+                    done += words_done
+                    if display is not None:
+                        display(done, max(stop - start, 1))
+                    yield unpack_results(results)
+        finally:
+            for future in running:
+                future.cancel()
+            table.close()
+            table.unlink()
+
+    def split(self, task):
+        wordi, word_stop, sub_start, sub_stop = task
+        return [(wordi, word_stop, lo, hi) for lo, hi in split_range(sub_start, sub_stop, self.proc_count)]
+
+
+def split_range(start, stop, parts):
+    # Split a range into about even parts, always giving at least one
+    size = max(1, -(-(stop - start) // parts))
+    return [(lo, min(lo + size, stop)) for lo in range(start, stop, size)] or [(start, stop)]